@@ -0,0 +1,25 @@
+"""
+Process-wide HTTP clients shared by the LangChain chat models.
+
+Every ChatOpenAI instance otherwise opens its own connection pool, paying
+DNS + TCP + TLS setup again for each new client. Sharing one keep-alive
+pool (HTTP/2 where the provider supports it) means a new agent only costs
+a request on an already-open connection.
+"""
+import atexit
+import httpx
+
+_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+# httpx drops idle connections after 5 s by default, shorter than the gap
+# between most chat turns; keep them long enough to be reused by the next one
+_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50, keepalive_expiry=30.0)
+
+SHARED_HTTPX = httpx.Client(http2=True, timeout=_TIMEOUT, limits=_LIMITS)
+SHARED_ASYNC_HTTPX = httpx.AsyncClient(http2=True, timeout=_TIMEOUT, limits=_LIMITS)
+
+atexit.register(SHARED_HTTPX.close)
+
+
+async def aclose_shared_clients():
+    """Close the async client; call from the application shutdown hook."""
+    await SHARED_ASYNC_HTTPX.aclose()
@@ -1,22 +1,14 @@
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from app.agents.requirement_agent import get_llm
+from app.agents.requirement_agent import (
+    DEFAULT_MODELS,
+    build_system_message,
+    get_cached_agent,
+    tool_schemas,
+)
 from app.tools.rag_tool import search_knowledge_base
 from app.tools.memory_tool import save_solution
 
-def get_developer_agent(user_id=2, ai_provider=None, ai_api_key=None, agent_type="developer_agent"):
-    """
-    Get developer agent for technical solution generation.
-
-    Args:
-        user_id: User ID
-        ai_provider: AI provider (OpenAI or Anthropic)
-        ai_api_key: API key
-        agent_type: Agent type for KB context (default: developer_agent)
-    """
-    llm = get_llm(user_id=user_id, ai_provider=ai_provider, ai_api_key=ai_api_key)
-    tools = [search_knowledge_base, save_solution]
-    
-    system_prompt = r"""You are an expert Laravel Developer Agent specializing in creating COMPREHENSIVE technical solution documents. Your goal is to transform detailed requirements into a complete, actionable technical architecture and implementation plan.
+DEVELOPER_SYSTEM_PROMPT = r"""You are an expert Laravel Developer Agent specializing in creating COMPREHENSIVE technical solution documents. Your goal is to transform detailed requirements into a complete, actionable technical architecture and implementation plan.
 
 **Your Responsibilities:**
 
@@ -108,10 +100,10 @@ CREATE TABLE users (
 
 ### 3.2 Entity Relationship Diagram (Text Format)
 ```
-users ||--o{{ posts : creates
-users ||--o{{ comments : writes
-posts ||--o{{ comments : has
-categories ||--o{{ posts : contains
+users ||--o{ posts : creates
+users ||--o{ comments : writes
+posts ||--o{ comments : has
+categories ||--o{ posts : contains
 ```
 
 ### 3.3 Data Migration Strategy
@@ -125,29 +117,29 @@ categories ||--o{{ posts : contains
 
 #### Authentication Endpoints
 - **POST /api/auth/register**
-  - Request Body: `{{ name, email, password, password_confirmation }}`
-  - Response: `{{ success, data: {{ user, token }}, message }}`
+  - Request Body: `{ name, email, password, password_confirmation }`
+  - Response: `{ success, data: { user, token }, message }`
   - Validation: Email format, password min 8 chars, unique email
   - Status Codes: 201 (success), 422 (validation error)
 
 - **POST /api/auth/login**
-  - Request Body: `{{ email, password }}`
-  - Response: `{{ success, data: {{ user, token, expires_at }}, message }}`
+  - Request Body: `{ email, password }`
+  - Response: `{ success, data: { user, token, expires_at }, message }`
   - Status Codes: 200 (success), 401 (invalid credentials), 422 (validation error)
 
 [Continue for ALL endpoints with complete specifications]
 
 ### 4.2 API Response Format Standards
 ```json
-{{
+{
     "success": true,
-    "data": {{ ... }},
+    "data": { ... },
     "message": "Operation successful",
-    "meta": {{
+    "meta": {
         "timestamp": "2024-01-01T12:00:00Z",
         "version": "1.0"
-    }}
-}}
+    }
+}
 ```
 
 ### 4.3 Error Handling Strategy
@@ -170,7 +162,7 @@ use Illuminate\Foundation\Auth\User as Authenticatable;
 use Laravel\Sanctum\HasApiTokens;
 
 class User extends Authenticatable
-{{
+{
     use HasApiTokens, HasFactory, SoftDeletes;
 
     protected $fillable = [
@@ -188,18 +180,18 @@ class User extends Authenticatable
     ];
 
     // Relationships
-    public function posts() {{
+    public function posts() {
         return $this->hasMany(Post::class);
-    }}
+    }
 
     // Scopes
-    public function scopeActive($query) {{
+    public function scopeActive($query) {
         return $query->where('is_active', true);
-    }}
+    }
 
     // Accessors & Mutators
     // Business logic methods
-}}
+}
 ```
 
 [Repeat for EACH model with complete code structure]
@@ -266,26 +258,26 @@ class User extends Authenticatable
 namespace App\Http\Requests;
 
 class StoreUserRequest extends FormRequest
-{{
-    public function authorize() {{
+{
+    public function authorize() {
         return auth()->user()->hasRole('admin');
-    }}
+    }
 
-    public function rules() {{
+    public function rules() {
         return [
             'name' => 'required|string|max:255',
             'email' => 'required|email|unique:users,email',
             'password' => 'required|min:8|confirmed',
             'role' => 'required|in:admin,manager,user',
         ];
-    }}
+    }
 
-    public function messages() {{
+    public function messages() {
         return [
             'email.unique' => 'This email is already registered',
         ];
-    }}
-}}
+    }
+}
 ```
 
 [Define ALL form requests with validation rules]
@@ -465,10 +457,57 @@ class StoreUserRequest extends FormRequest
 
 Once your technical solution is complete, use the 'save_solution' tool to save the comprehensive markdown document."""
 
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", system_prompt),
+# Built once per provider at import. The prompt is passed as a literal
+# SystemMessage (not a template string), so braces in the examples above
+# need no escaping and only the messages placeholder is formatted per call.
+_DEVELOPER_PROMPTS = {
+    provider: ChatPromptTemplate.from_messages([
+        build_system_message(provider, DEVELOPER_SYSTEM_PROMPT),
         MessagesPlaceholder(variable_name="messages"),
     ])
-    
-    agent = prompt | llm.bind_tools(tools)
-    return agent
+    for provider in DEFAULT_MODELS
+}
+
+def get_developer_agent(user_id=2, ai_provider=None, ai_api_key=None, agent_type="developer_agent"):
+    """
+    Get developer agent for technical solution generation.
+
+    Args:
+        user_id: User ID
+        ai_provider: AI provider (OpenAI or Anthropic)
+        ai_api_key: API key
+        agent_type: Agent type for KB context (default: developer_agent)
+    """
+    return get_cached_agent(
+        agent_type,
+        _build_developer_agent,
+        user_id=user_id,
+        ai_provider=ai_provider,
+        ai_api_key=ai_api_key
+    )
+
+def get_developer_agent_streaming(user_id=2, ai_provider=None, ai_api_key=None, agent_type="developer_agent"):
+    """
+    Get developer agent tagged for streaming consumers.
+
+    The solution document can run to many pages, so callers should consume it
+    incrementally instead of waiting for the full completion:
+
+        async for chunk in agent.astream({"messages": messages}):
+            ...
+
+    Text arrives in chunk.content as it is generated; a save_solution tool
+    call is assembled from chunk.tool_call_chunks once the stream finishes.
+    """
+    agent = get_developer_agent(
+        user_id=user_id,
+        ai_provider=ai_provider,
+        ai_api_key=ai_api_key,
+        agent_type=agent_type
+    )
+    return agent.with_config({"run_name": "developer"})
+
+_DEVELOPER_TOOLS = tool_schemas([search_knowledge_base, save_solution])
+
+def _build_developer_agent(llm, provider):
+    return _DEVELOPER_PROMPTS[provider] | llm.bind_tools(list(_DEVELOPER_TOOLS))
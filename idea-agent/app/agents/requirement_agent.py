@@ -1,257 +1,283 @@
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_openai import ChatOpenAI
-from langchain_anthropic import ChatAnthropic
+from langchain_core.messages import SystemMessage
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from app.agents._http import SHARED_ASYNC_HTTPX, SHARED_HTTPX
 from app.database import get_llm_config
+from app.prompt_loader import load_prompt
 from app.tools.memory_tool import save_requirements
+from collections import OrderedDict
+from functools import lru_cache
+import hashlib
+import importlib
 import os
-
-def get_llm(user_id=2, ai_provider=None, ai_api_key=None):
+import threading
+
+# Default chat model per provider. Requirement gathering is conversational and
+# runs on the fast tier; the developer agent keeps the stronger models.
+DEFAULT_MODELS = {
+    'OpenAI': 'gpt-4o',
+    'Anthropic': 'claude-3-5-sonnet-20240620',
+}
+FAST_MODELS = {
+    'OpenAI': 'gpt-4o-mini',
+    'Anthropic': 'claude-3-5-haiku-latest',
+}
+
+# Provider SDKs are imported on first use: a deployment normally talks to a
+# single provider and each SDK pulls in a large dependency stack.
+_CHAT_MODEL_IMPORTS = {
+    'OpenAI': ('langchain_openai', 'ChatOpenAI'),
+    'Anthropic': ('langchain_anthropic', 'ChatAnthropic'),
+}
+_chat_model_classes = {}
+
+# Chat model clients keyed by (provider, model, sha256(api_key), model_kwargs)
+_LLM_CACHE_MAXSIZE = 64
+_llm_cache = OrderedDict()
+_llm_cache_lock = threading.Lock()
+
+# Compiled agent runnables (prompt | llm.bind_tools(tools)), keyed by
+# (agent_type, provider, model, sha256(api_key)) so plain API keys never end up in cache keys
+_AGENT_CACHE_MAXSIZE = 64
+_agent_cache = OrderedDict()
+_agent_cache_lock = threading.Lock()
+
+def _hash_api_key(api_key):
+    # Not memoized: a cache would keep the plain keys it is meant to avoid
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+def _cache_get(cache, lock, key):
+    with lock:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+def _cache_put(cache, lock, key, value, maxsize):
+    with lock:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > maxsize:
+            cache.popitem(last=False)
+
+def resolve_llm_config(user_id=2, ai_provider=None, ai_api_key=None):
     config = get_llm_config(user_id=user_id, ai_provider=ai_provider, ai_api_key=ai_api_key)
     if not config:
         raise ValueError(
             "AI configuration not found. Please configure your AI settings at "
             "http://localhost:8000/settings/ai with your OpenAI or Anthropic API key."
         )
+    return config
 
-    if config['provider'] == 'OpenAI':
-        return ChatOpenAI(api_key=config['api_key'], model="gpt-4o")
-    elif config['provider'] == 'Anthropic':
-        return ChatAnthropic(api_key=config['api_key'], model="claude-3-5-sonnet-20240620")
+def get_llm(user_id=2, ai_provider=None, ai_api_key=None, model=None):
+    config = resolve_llm_config(user_id=user_id, ai_provider=ai_provider, ai_api_key=ai_api_key)
+    return create_llm(config, model=model)
 
-    raise ValueError(f"Unsupported AI provider: {config['provider']}")
+def get_chat_model_class(provider):
+    cls = _chat_model_classes.get(provider)
+    if cls is None:
+        module_name, class_name = _CHAT_MODEL_IMPORTS[provider]
+        cls = getattr(importlib.import_module(module_name), class_name)
+        _chat_model_classes[provider] = cls
+    return cls
 
-def get_requirement_agent(user_id=2, ai_provider=None, ai_api_key=None, agent_type="requirement_agent"):
+def create_llm(config, model=None, **model_kwargs):
     """
-    Get requirement gathering agent.
-
-    Args:
-        user_id: User ID
-        ai_provider: AI provider (OpenAI or Anthropic)
-        ai_api_key: API key
-        agent_type: Agent type for KB context (default: requirement_agent)
+    Return the chat model client for config, reusing one instance per
+    (provider, model, api key, model_kwargs). Building a client parses its
+    settings and loads tokenizer data, so it is only done on a cache miss.
     """
-    llm = get_llm(user_id=user_id, ai_provider=ai_provider, ai_api_key=ai_api_key)
-    tools = [save_requirements]
-
-    system_prompt = r"""You are an expert Requirement Gathering Agent for Laravel projects. Your role is to conduct a deep, structured conversation to gather COMPREHENSIVE and DETAILED requirements. You must extract granular details at every stage.
-
-Follow this systematic approach through 7 stages:
-
-**STAGE 1: Identify Business Context (Deep Dive)**
-- Ask: "What is the main goal of this solution? What business problem are you solving?"
-- Follow up with: "What happens if this problem isn't solved? Who is affected?"
-- Dig deeper: "What does success look like? How will you measure it?"
-- Understand the complete business context, not just surface-level goals
-- Get specific metrics, KPIs, or success criteria
-- Identify stakeholders and their expectations
-
-**STAGE 2: Understand Users & Use Cases (Detailed Analysis)**
-- Ask: "Who will use this system? Describe each type of user."
-- For EACH user type, ask:
-  - "What are their goals when using the system?"
-  - "What tasks do they need to perform? Walk me through a typical day."
-  - "What pain points do they currently experience?"
-  - "What's their technical skill level?"
-- Map out complete user journeys with specific steps
-- Identify edge cases and alternative flows
-- Don't accept generic answers - probe for specifics
-
-**STAGE 3: Functional Requirements (Feature-by-Feature Deep Dive)**
-- Ask: "What features are essential? Let's go through each one in detail."
-- For EACH feature, ask:
-  - "Describe exactly how this feature should work."
-  - "What are the inputs? What are the outputs?"
-  - "What happens if something goes wrong?"
-  - "Are there any business rules or validations?"
-  - "What notifications or feedback should users receive?"
-- Identify complete workflows with all decision points
-- Understand data requirements for each feature
-- Prioritize: must-have, should-have, nice-to-have
-- Get specific examples and scenarios
-- Ask about reporting and analytics needs
-
-**STAGE 4: Non-Functional Requirements (Detailed Specifications)**
-- Ask detailed questions about:
-  - **Performance**: "How many users? How many concurrent users? Response time expectations? Data volume?"
-  - **Security**: "Who should access what? Authentication method? Password policies? Data encryption needs? Audit trails?"
-  - **Compliance**: "Any regulations (GDPR, HIPAA, PCI-DSS, etc.)? Data retention policies? Privacy requirements?"
-  - **Availability**: "Uptime requirements? Maintenance windows? Disaster recovery needs?"
-  - **Scalability**: "Expected growth over 1 year, 3 years? Seasonal peaks?"
-  - **Usability**: "Accessibility requirements (WCAG)? Multi-language support? Mobile responsiveness?"
-
-**STAGE 5: Constraints & Integrations (Complete Technical Context)**
-- Ask: "Any existing systems to integrate with? Describe each integration."
-- For EACH integration:
-  - "What data needs to be shared?"
-  - "Real-time or batch?"
-  - "Any API documentation available?"
-  - "Authentication requirements?"
-- Technical constraints: "Any technology preferences? Hosting environment? Database preferences?"
-- Business constraints: "Budget range? Timeline? Team size? Existing skills?"
-- Compliance or organizational constraints
-- Infrastructure and deployment requirements
-
-**STAGE 6: Validate & Summarize (Comprehensive Review)**
-- Present a DETAILED summary of ALL gathered information
-- Organize by sections with clear headings
-- Include specific examples and scenarios discussed
-- Ask: "Does this accurately capture everything? Let's review section by section."
-- "Is anything missing? Any details need clarification?"
-- "Are priorities correct?"
-- Allow user to add, correct, or expand on any details
-- Confirm complete understanding before finalizing
-
-**STAGE 7: Generate Requirement Document (Detailed PRD Format)**
-Once validated, use the 'save_requirements' tool with a comprehensive markdown document following this structure:
-
-```markdown
-# Project Requirements Document
-
-## 1. Executive Summary
-- Project name and vision
-- Business problem and solution overview
-- Success metrics and KPIs
-- Key stakeholders
-
-## 2. Business Context
-- Detailed problem statement
-- Current situation and pain points
-- Expected business impact
-- Success criteria with specific metrics
-
-## 3. User Personas & Use Cases
-### User Persona 1: [Name/Role]
-- Description and characteristics
-- Goals and motivations
-- Pain points
-- Technical proficiency
-- Use cases and user journeys (step-by-step)
-
-[Repeat for each user type]
-
-## 4. Functional Requirements
-
-### 4.1 [Feature Category 1]
-#### Feature 1.1: [Feature Name]
-- **Description**: Detailed explanation
-- **User Story**: As a [user], I want to [action] so that [benefit]
-- **Acceptance Criteria**:
-  - Specific, measurable criteria
-  - Expected inputs and outputs
-  - Business rules and validations
-- **Workflow**: Step-by-step process
-- **Edge Cases**: What happens when...
-- **Priority**: Must-have / Should-have / Nice-to-have
-
-[Repeat for each feature]
-
-### 4.2 [Feature Category 2]
-[Continue...]
-
-## 5. Non-Functional Requirements
-
-### 5.1 Performance
-- Expected user load (concurrent users, daily active users)
-- Response time requirements
-- Data volume expectations
-- Scalability requirements
-
-### 5.2 Security
-- Authentication and authorization approach
-- User roles and permissions matrix
-- Data encryption requirements
-- Audit trail requirements
-- Password policies
-- Session management
-
-### 5.3 Compliance
-- Regulatory requirements (GDPR, HIPAA, etc.)
-- Data retention policies
-- Privacy requirements
-- Audit requirements
-
-### 5.4 Availability & Reliability
-- Uptime requirements (e.g., 99.9%)
-- Backup and disaster recovery
-- Maintenance windows
-- Monitoring requirements
-
-### 5.5 Usability
-- Accessibility standards (WCAG)
-- Browser compatibility
-- Mobile responsiveness
-- Internationalization (languages, timezones)
-
-## 6. Integration Requirements
-
-### Integration 1: [System Name]
-- **Purpose**: Why integrate
-- **Data Exchange**: What data, format, frequency
-- **Authentication**: How to authenticate
-- **Error Handling**: What happens when integration fails
-- **API Details**: Endpoints, documentation links
-
-[Repeat for each integration]
-
-## 7. Technical Constraints
-- Technology stack preferences/requirements
-- Infrastructure and hosting requirements
-- Database requirements
-- Third-party services
-- Development environment
-
-## 8. Business Constraints
-- Budget considerations
-- Timeline and milestones
-- Team composition
-- Organizational constraints
-
-## 9. Data Requirements
-- Data models and entities
-- Data validation rules
-- Data migration needs (if any)
-- Data import/export requirements
-
-## 10. Reporting & Analytics
-- Required reports
-- Dashboard requirements
-- Analytics and metrics to track
-- Export formats
-
-## 11. Open Questions & Assumptions
-- Any unresolved questions
-- Assumptions made
-- Areas needing further clarification
-```
-
-**CRITICAL GUIDELINES:**
-
-1. **NEVER ACCEPT ONE-LINERS**: If the user gives brief answers, ask follow-up questions to get details
-   - Bad: "User management"
-   - Good: "User management where admins can create, edit, deactivate users. Each user has a role (admin, manager, viewer) with specific permissions. Admins see an audit log of all user actions. Users receive email notifications when their account is created or modified."
-
-2. **DIG DEEPER**: Always ask "Can you elaborate?" or "Can you give me a specific example?"
-
-3. **BE SPECIFIC**: Get numbers, timeframes, exact workflows, concrete examples
-
-4. **PROBE FOR EDGE CASES**: "What happens if...?" "What about when...?"
+    if config['provider'] not in _LLM_BUILDERS:
+        raise ValueError(f"Unsupported AI provider: {config['provider']}")
+
+    model = model or DEFAULT_MODELS[config['provider']]
+    cache_key = (
+        config['provider'],
+        model,
+        _hash_api_key(config['api_key']),
+        tuple(sorted(model_kwargs.items())),
+    )
+
+    llm = _cache_get(_llm_cache, _llm_cache_lock, cache_key)
+    if llm is None:
+        llm = _LLM_BUILDERS[config['provider']](config['api_key'], model, **model_kwargs)
+        _cache_put(_llm_cache, _llm_cache_lock, cache_key, llm, _LLM_CACHE_MAXSIZE)
+    return llm
+
+# Both provider SDKs retry 429, 5xx and connection errors themselves, with
+# exponential backoff that honours Retry-After; one more attempt than their
+# default of 2 rides out short rate-limit bursts without failing the turn.
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+
+# Requests per minute allowed per provider API key in this process (0: no
+# limit). Calls over budget wait for a token instead of drawing 429s and the
+# SDK's backoff; with several workers, divide the provider's RPM between them.
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "0"))
+
+@lru_cache(maxsize=256)
+def _rate_limiter(provider, api_key_hash):
+    # One token bucket per key, shared by every model and agent using it
+    from langchain_core.rate_limiters import InMemoryRateLimiter
+    requests_per_second = LLM_REQUESTS_PER_MINUTE / 60
+    return InMemoryRateLimiter(
+        requests_per_second=requests_per_second,
+        max_bucket_size=max(1.0, requests_per_second)
+    )
+
+def _with_rate_limiter(provider, api_key, model_kwargs):
+    if LLM_REQUESTS_PER_MINUTE > 0:
+        model_kwargs.setdefault('rate_limiter', _rate_limiter(provider, _hash_api_key(api_key)))
+
+# streaming=True lets astream()/astream_events() surface tokens as they are
+# generated; invoke() still returns the aggregated message.
+def _build_openai_llm(api_key, model, **model_kwargs):
+    model_kwargs.setdefault('max_retries', LLM_MAX_RETRIES)
+    _with_rate_limiter('OpenAI', api_key, model_kwargs)
+    return get_chat_model_class('OpenAI')(
+        api_key=api_key,
+        model=model,
+        streaming=True,
+        http_client=SHARED_HTTPX,
+        http_async_client=SHARED_ASYNC_HTTPX,
+        **model_kwargs
+    )
+
+# Anthropic only honours a "ttl" in cache_control with this beta enabled
+ANTHROPIC_EXTENDED_CACHE_TTL_BETA = "extended-cache-ttl-2025-04-11"
+
+def _build_anthropic_llm(api_key, model, extended_cache_ttl=False, **model_kwargs):
+    # langchain_anthropic already reuses one cached httpx client per base URL
+    model_kwargs.setdefault('max_retries', LLM_MAX_RETRIES)
+    if extended_cache_ttl:
+        model_kwargs['default_headers'] = {"anthropic-beta": ANTHROPIC_EXTENDED_CACHE_TTL_BETA}
+    _with_rate_limiter('Anthropic', api_key, model_kwargs)
+    return get_chat_model_class('Anthropic')(api_key=api_key, model=model, streaming=True, **model_kwargs)
+
+# Provider-specific construction, resolved with one dict lookup
+_LLM_BUILDERS = {
+    'OpenAI': _build_openai_llm,
+    'Anthropic': _build_anthropic_llm,
+}
+
+def build_system_message(provider, text, cache_ttl=None):
+    """
+    Build the static system message for an agent prompt.
 
-5. **GET CONTEXT**: Don't just list features - understand WHY each feature is needed
+    Anthropic only caches a prompt prefix that carries an explicit
+    cache_control breakpoint; OpenAI caches identical prefixes automatically,
+    so the text just has to stay byte-identical across calls. cache_ttl
+    ("1h") extends Anthropic's default 5 minute cache lifetime.
+    """
+    if provider == 'Anthropic':
+        return SystemMessage(content=[
+            {"type": "text", "text": text, "cache_control": anthropic_cache_control(cache_ttl)}
+        ])
+    return SystemMessage(content=text)
+
+def anthropic_cache_control(ttl=None):
+    """cache_control for an Anthropic content block; ttl=None keeps the 5 minute default."""
+    if ttl is None:
+        return {"type": "ephemeral"}
+    return {"type": "ephemeral", "ttl": ttl}
+
+def chunk_text(chunk):
+    """Text of a streamed message chunk (Anthropic streams a list of content blocks)."""
+    if isinstance(chunk.content, str):
+        return chunk.content
+    return "".join(
+        block.get("text", "")
+        for block in chunk.content
+        if isinstance(block, dict) and block.get("type") == "text"
+    )
+
+def get_cached_agent(agent_type, build_agent, user_id=2, ai_provider=None, ai_api_key=None, models=None):
+    """
+    Return the compiled agent runnable for the resolved AI configuration,
+    building it with build_agent(llm, provider) only on a cache miss.
 
-6. **CLARIFY AMBIGUITY**: If something is vague, ask multiple clarifying questions
+    models maps provider to chat model (default: DEFAULT_MODELS).
+    """
+    config = resolve_llm_config(user_id=user_id, ai_provider=ai_provider, ai_api_key=ai_api_key)
+    model = (models or DEFAULT_MODELS).get(config['provider'])
+    cache_key = (agent_type, config['provider'], model, _hash_api_key(config['api_key']))
+
+    agent = _cache_get(_agent_cache, _agent_cache_lock, cache_key)
+    if agent is None:
+        agent = build_agent(create_llm(config, model=model), config['provider'])
+        _cache_put(_agent_cache, _agent_cache_lock, cache_key, agent, _AGENT_CACHE_MAXSIZE)
+    return agent
 
-7. **ONE STAGE AT A TIME**: Don't rush - spend adequate time in each stage
+def tool_schemas(tools):
+    """
+    Convert tools to OpenAI-format tool definitions once, at import time.
 
-8. **SAVE DETAILED DOCUMENT**: The final requirements document should be 3-5 pages minimum, with rich detail in every section
+    Both chat model classes pass an already-converted definition straight
+    through bind_tools(), so agents built from these skip re-walking each
+    tool's pydantic args schema every time they are constructed.
+    """
+    return tuple(convert_to_openai_tool(tool) for tool in tools)
 
-9. **FORMAT PROPERLY**: Use markdown formatting with headers, bullet points, numbered lists, and tables where appropriate
+def clear_agent_cache():
+    """Drop all cached agents and chat model clients, e.g. after a user rotates their API key."""
+    with _agent_cache_lock:
+        _agent_cache.clear()
+    with _llm_cache_lock:
+        _llm_cache.clear()
 
-When you have completed all stages and received user validation, call the 'save_requirements' tool with the comprehensive, detailed markdown document. The document should be thorough enough that a developer can understand the complete project scope without additional questions."""
+def get_requirement_agent(user_id=2, ai_provider=None, ai_api_key=None, agent_type="requirement_agent", force_save=False):
+    """
+    Get requirement gathering agent.
 
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", system_prompt),
+    Args:
+        user_id: User ID
+        ai_provider: AI provider (OpenAI or Anthropic)
+        ai_api_key: API key
+        agent_type: Agent type for KB context (default: requirement_agent)
+        force_save: Force the response to be a save_requirements call
+                    (used to retry a save whose arguments failed validation)
+    """
+    if force_save:
+        return get_cached_agent(
+            f"{agent_type}:save",
+            _build_requirement_save_agent,
+            user_id=user_id,
+            ai_provider=ai_provider,
+            ai_api_key=ai_api_key,
+            models=FAST_MODELS
+        )
+    return get_cached_agent(
+        agent_type,
+        _build_requirement_agent,
+        user_id=user_id,
+        ai_provider=ai_provider,
+        ai_api_key=ai_api_key,
+        models=FAST_MODELS
+    )
+
+REQUIREMENT_SYSTEM_PROMPT = load_prompt("requirement_agent.md")
+
+# Changes whenever the prompt text or the model choice changes; used to scope cached replies
+REQUIREMENT_PROMPT_VERSION = hashlib.sha256(
+    (REQUIREMENT_SYSTEM_PROMPT + repr(sorted(FAST_MODELS.items()))).encode()
+).hexdigest()[:12]
+
+# The static system prompt always comes first and is byte-identical across
+# turns, so it is served from the provider's prompt cache (an explicit
+# cache_control breakpoint on Anthropic, automatic prefix caching on OpenAI);
+# only the conversation tail changes between calls.
+_REQUIREMENT_PROMPTS = {
+    provider: ChatPromptTemplate.from_messages([
+        build_system_message(provider, REQUIREMENT_SYSTEM_PROMPT),
         MessagesPlaceholder(variable_name="messages"),
     ])
+    for provider in DEFAULT_MODELS
+}
 
-    agent = prompt | llm.bind_tools(tools)
-    return agent
+_REQUIREMENT_TOOLS = tool_schemas([save_requirements])
+
+def _build_requirement_agent(llm, provider):
+    return _REQUIREMENT_PROMPTS[provider] | llm.bind_tools(list(_REQUIREMENT_TOOLS))
+
+def _build_requirement_save_agent(llm, provider):
+    # tool_choice by name forces the reply to be exactly this tool call
+    return _REQUIREMENT_PROMPTS[provider] | llm.bind_tools(list(_REQUIREMENT_TOOLS), tool_choice="save_requirements")
@@ -0,0 +1,64 @@
+"""
+Agent warmup - run once at application startup.
+
+The first request after boot otherwise pays for building the agent,
+resolving the user's AI settings and opening the provider connection
+(DNS + TCP + TLS + auth) before the first token arrives.
+"""
+from langchain_core.messages import HumanMessage
+from app.agents.requirement_agent import (
+    FAST_MODELS,
+    create_llm,
+    get_requirement_agent,
+    resolve_llm_config,
+)
+import asyncio
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on the whole warmup; users still warming are given up on
+AGENT_WARMUP_TIMEOUT = float(os.getenv("AGENT_WARMUP_TIMEOUT", "30"))
+
+
+def _warmup_user_ids():
+    raw = os.getenv("AGENT_WARMUP_USER_IDS", "")
+    return [int(user_id) for user_id in raw.split(",") if user_id.strip()]
+
+
+def _warm_user(user_id):
+    # Populate the agent cache for this user's provider/key
+    get_requirement_agent(user_id=user_id)
+
+    # One-token round trip to open a pooled keep-alive connection
+    config = resolve_llm_config(user_id=user_id)
+    llm = create_llm(config, model=FAST_MODELS[config['provider']])
+    llm.bind(max_tokens=1).invoke([HumanMessage(content="ping")])
+
+
+async def _warm_user_async(user_id):
+    try:
+        await asyncio.to_thread(_warm_user, user_id)
+        logger.info("Agent warmed up for user %s", user_id)
+    except Exception as e:
+        logger.warning("Agent warmup failed for user %s: %s", user_id, e)
+
+
+async def warmup_agents():
+    """
+    Warm agents for the users listed in AGENT_WARMUP_USER_IDS (comma separated).
+
+    Users are warmed concurrently, within AGENT_WARMUP_TIMEOUT seconds overall.
+    Run it as a background task: failures and timeouts are only reported.
+    """
+    user_ids = _warmup_user_ids()
+    if not user_ids:
+        return
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(*(_warm_user_async(user_id) for user_id in user_ids)),
+            timeout=AGENT_WARMUP_TIMEOUT
+        )
+    except asyncio.TimeoutError:
+        logger.warning("Agent warmup did not finish within %ss", AGENT_WARMUP_TIMEOUT)
@@ -0,0 +1,75 @@
+"""
+Bounded background queue for fire-and-forget work on the event loop.
+
+Jobs are queued from request handlers and run one at a time by a single
+worker task, so the handler returns immediately, the downstream service sees
+at most one request from this process at a time, and a burst can never hold
+more than `maxsize` pending jobs (extra jobs are dropped with a warning).
+The queue keeps a reference to the worker, so jobs are not garbage collected
+mid-flight, and pending jobs are drained in the shutdown hook.
+
+A job that raises is retried up to `max_retries` times with exponential
+backoff (retry_delay, 2 * retry_delay, ...) before it is logged and dropped.
+The worker waits out the backoff itself, so jobs stay in submission order.
+"""
+import asyncio
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundQueue:
+    """Run queued coroutine functions sequentially on one worker task."""
+
+    def __init__(self, name: str, maxsize: int = 1000, max_retries: int = 0, retry_delay: float = 1.0):
+        self.name = name
+        self.maxsize = maxsize
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def submit(self, func, *args, **kwargs):
+        """Queue func(*args, **kwargs); drops the job if the queue is full."""
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.maxsize)
+        try:
+            self._queue.put_nowait((func, args, kwargs))
+        except asyncio.QueueFull:
+            logger.warning("%s queue is full, dropping job", self.name)
+            return
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while not self._queue.empty():
+            func, args, kwargs = self._queue.get_nowait()
+            try:
+                await self._run_job(func, args, kwargs)
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, func, args, kwargs):
+        for attempt in range(self.max_retries + 1):
+            try:
+                await func(*args, **kwargs)
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logger.exception("%s job failed", self.name)
+                    return
+                delay = self.retry_delay * 2 ** attempt
+                logger.warning("%s job failed (%s), retrying in %.1fs", self.name, e, delay)
+                await asyncio.sleep(delay)
+
+    async def aclose(self, timeout: float = 10):
+        """Wait for pending jobs to finish; call from the shutdown hook."""
+        if self._worker is None or self._worker.done():
+            return
+        logger.info("Waiting for %s pending %s job(s)", self._queue.qsize(), self.name)
+        try:
+            await asyncio.wait_for(asyncio.shield(self._worker), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("%s jobs still pending at shutdown, cancelling", self.name)
+            self._worker.cancel()
@@ -0,0 +1,97 @@
+"""
+Batched background writer for per-turn conversation metadata.
+
+After the first turn a conversation already exists in Laravel, and each
+further turn only bumps its message count. Those updates are queued here,
+coalesced per thread (only the latest count is kept) and sent to Laravel in a
+single bulk request every few seconds, off the /ask response path.
+"""
+import asyncio
+import logging
+import os
+from typing import Dict, Optional
+
+from cachetools import TTLCache
+
+from app.database import save_conversation_metadata_bulk_async
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = float(os.getenv("CONVERSATION_FLUSH_INTERVAL", "2"))
+# Upper bound on items per bulk request (Laravel validates max:500)
+MAX_BATCH = 200
+
+
+class ConversationMetadataWriter:
+    """Keep the latest message count per thread and flush them in batches."""
+
+    def __init__(self, interval: float = FLUSH_INTERVAL):
+        self.interval = interval
+        self.pending: Dict[str, int] = {}
+        # Laravel conversation IDs of recently active threads, so callers can
+        # still reference the conversation without waiting for a write
+        self.conversation_ids = TTLCache(maxsize=4096, ttl=3600)
+        self._task: Optional[asyncio.Task] = None
+
+    def remember(self, thread_id: str, conversation_id: Optional[int]):
+        if conversation_id is not None:
+            self.conversation_ids[thread_id] = conversation_id
+
+    def conversation_id(self, thread_id: str) -> Optional[int]:
+        return self.conversation_ids.get(thread_id)
+
+    def submit(self, thread_id: str, message_count: int):
+        """Queue the message count of an existing conversation."""
+        self.pending[thread_id] = message_count
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while self.pending:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    async def flush(self):
+        """Send every pending update now; a failed batch stays queued."""
+        while self.pending:
+            batch = dict(list(self.pending.items())[:MAX_BATCH])
+            for thread_id in batch:
+                del self.pending[thread_id]
+
+            items = [
+                {'thread_id': thread_id, 'message_count': message_count}
+                for thread_id, message_count in batch.items()
+            ]
+            try:
+                saved = await save_conversation_metadata_bulk_async(items)
+            except asyncio.CancelledError:
+                # Cancelled mid-request (e.g. by aclose); aclose re-sends the
+                # batch, and resending absolute counts is harmless
+                self._restore(batch)
+                raise
+            if saved is None:
+                self._restore(batch)
+                return
+
+    def _restore(self, batch):
+        # Keep the unsent counts unless newer ones arrived meanwhile
+        for thread_id, message_count in batch.items():
+            self.pending.setdefault(thread_id, message_count)
+
+    async def aclose(self):
+        """Flush pending updates once more; call from the shutdown hook."""
+        task, self._task = self._task, None
+        if task is not None:
+            # Wait for the cancellation to land, so a batch that was in
+            # flight is back in pending before the final flush
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if self.pending:
+            logger.info("Flushing %s pending conversation update(s)", len(self.pending))
+            await self.flush()
+
+
+conversation_writer = ConversationMetadataWriter()
@@ -1,23 +1,141 @@
-import mysql.connector
 import os
 from dotenv import load_dotenv
 import requests
-from functools import lru_cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from cachetools import TTLCache
+from app.http import LARAVEL_CIRCUIT, laravel_request
+from app.redis_client import get_redis_client
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+import gzip
+import httpx
+import orjson
+import redis
+import threading
 import time
+import logging
 
 load_dotenv()
 
-# In-memory cache for API keys (expires after 5 minutes)
-_api_key_cache = {}
+logger = logging.getLogger(__name__)
+
+# Cache for AI settings fetched from Laravel, keyed by user_id. Redis is
+# shared by every worker process and holds entries for 5 minutes; the
+# in-memory TTLCache sits in front of it and keeps serving when Redis is
+# unavailable. invalidate_llm_config() only reaches the local copy of the
+# worker it runs in, so local entries live just long enough to absorb bursts
+# and other workers pick up changed settings from Redis within that window.
 _cache_ttl = 300  # 5 minutes
+_local_cache_ttl = int(os.getenv("AI_SETTINGS_LOCAL_TTL", "30"))
+_api_key_cache = TTLCache(maxsize=1024, ttl=_local_cache_ttl)
+# Users whose lookup just failed (no settings saved, or Laravel erroring), so
+# repeated requests return None at once instead of re-running the retries
+_negative_cache_ttl = 30
+_api_key_miss_cache = TTLCache(maxsize=1024, ttl=_negative_cache_ttl)
+_api_key_cache_lock = threading.RLock()
+# In-flight Laravel fetches by cache key: concurrent misses for the same
+# user wait on the first caller's future instead of each calling Laravel
+_api_key_inflight = {}
+# Longest a waiter blocks on another request's fetch (urllib3 retries included)
+_API_KEY_WAIT_TIMEOUT = 60
+
+LARAVEL_API_URL = os.getenv("LARAVEL_API_URL", "http://laravel-app-dev:8000")
+
+# Laravel internal API endpoints: paths for the async client (which has the
+# base URL); the AI settings lookup runs in graph threads and uses the sync
+# session, so it needs the full URL
+_AI_SETTINGS_PATH = "/api/internal/ai-settings"
+_CONVERSATIONS_PATH = "/api/internal/conversations"
+_CONVERSATIONS_BULK_PATH = "/api/internal/conversations/bulk"
+_SOLUTION_DOCUMENT_PATH = "/api/internal/conversations/solution"
+_SOLUTIONS_PATH = "/api/internal/solutions"
+
+_AI_SETTINGS_URL = LARAVEL_API_URL + _AI_SETTINGS_PATH
+
+# One pooled keep-alive session for the synchronous AI settings lookup (the
+# writes go through the async client in app/http.py). Connection errors and gateway errors (502/503/504) are retried by urllib3
+# with exponential backoff plus jitter, so concurrent agents do not retry in
+# lockstep; other responses are returned to the caller as-is.
+_RETRY = Retry(
+    total=3,
+    backoff_factor=1,
+    backoff_jitter=0.5,
+    backoff_max=30,
+    status_forcelist=[502, 503, 504],
+    allowed_methods=["GET"],
+    raise_on_status=False
+)
+# Connect timeout: an unreachable Laravel fails fast and is retried by _RETRY.
+# Matches the 2s connect timeout of the async client in app/http.py.
+_CONNECT_TIMEOUT = 2
+_SESSION = requests.Session()
+_adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=_RETRY)
+_SESSION.mount("http://", _adapter)
+_SESSION.mount("https://", _adapter)
+
+def _laravel_call(method, url, **kwargs):
+    """Send a request through _SESSION, guarded by the shared Laravel circuit breaker."""
+    LARAVEL_CIRCUIT.before_call()
+    try:
+        response = _SESSION.request(method, url, **kwargs)
+    except requests.RequestException:
+        LARAVEL_CIRCUIT.record_failure()
+        raise
+    LARAVEL_CIRCUIT.record_status(response.status_code)
+    return response
+
+# Process-wide MySQL pool, created on first use so importing this module
+# never blocks on (or fails because of) the database
+_db_pool = None
+_db_pool_lock = threading.Lock()
+
+def _get_db_pool():
+    global _db_pool
+    if _db_pool is None:
+        with _db_pool_lock:
+            if _db_pool is None:
+                # Imported here: nothing in the agent's request path uses
+                # MySQL directly, so workers skip loading the connector
+                from mysql.connector import pooling
+
+                _db_pool = pooling.MySQLConnectionPool(
+                    pool_name="idea_agent",
+                    pool_size=int(os.getenv("DB_POOL_SIZE", "10")),
+                    pool_reset_session=False,
+                    use_pure=False,  # C extension when available
+                    host=os.getenv("DB_HOST", "mysql"),
+                    user=os.getenv("DB_USERNAME", "root"),
+                    password=os.getenv("DB_PASSWORD", "root"),
+                    database=os.getenv("DB_DATABASE", "laravel_app")
+                )
+    return _db_pool
 
 def get_db_connection():
-    return mysql.connector.connect(
-        host=os.getenv("DB_HOST", "mysql"),
-        user=os.getenv("DB_USERNAME", "root"),
-        password=os.getenv("DB_PASSWORD", "root"),
-        database=os.getenv("DB_DATABASE", "laravel_app")
-    )
+    """
+    Borrow a connection from the pool. close() (or leaving a
+    `with get_db_connection() as conn:` block) returns it to the pool.
+    """
+    return _get_db_pool().get_connection()
+
+# Documents above this size are gzipped before being sent to Laravel
+# (decoded by its DecompressGzipRequest middleware). Level 1 already shrinks
+# markdown ~3x at negligible CPU cost.
+GZIP_MIN_BYTES = 1024
+
+# Shared, never mutated: requests and httpx copy the headers they are given
+_JSON_HEADERS = {"Content-Type": "application/json", "Accept": "application/json"}
+_GZIP_JSON_HEADERS = {**_JSON_HEADERS, "Content-Encoding": "gzip"}
+
+def _encode_json_body(payload):
+    """Return (body, headers) for a JSON request, gzip-compressed when large."""
+    body = orjson.dumps(payload)
+    if len(body) >= GZIP_MIN_BYTES:
+        return gzip.compress(body, compresslevel=1), _GZIP_JSON_HEADERS
+    return body, _JSON_HEADERS
+
+def _response_data(response):
+    """The 'data' member of a Laravel JSON response."""
+    return orjson.loads(response.content).get('data')
 
 def get_api_key_from_laravel(user_id):
     """
@@ -26,59 +144,150 @@ def get_api_key_from_laravel(user_id):
     """
     # Check cache first
     cache_key = f"user_{user_id}"
-    if cache_key in _api_key_cache:
-        cached_data, timestamp = _api_key_cache[cache_key]
-        if time.time() - timestamp < _cache_ttl:
-            print(f"Using cached API key for user {user_id}")
+    cached_data = _get_cached_settings(cache_key, user_id)
+    if cached_data is not None:
+        logger.debug("Using cached API key for user %s", user_id)
+        return cached_data
+
+    with _api_key_cache_lock:
+        # A fetch may have completed since the check above
+        cached_data = _api_key_cache.get(cache_key)
+        if cached_data is not None:
             return cached_data
+        if cache_key in _api_key_miss_cache:
+            logger.debug("AI settings lookup for user %s failed recently, skipping", user_id)
+            return None
+        future = _api_key_inflight.get(cache_key)
+        is_owner = future is None
+        if is_owner:
+            future = Future()
+            _api_key_inflight[cache_key] = future
+
+    if not is_owner:
+        # Shares the owner's result, including a failed (None) lookup
+        try:
+            return future.result(timeout=_API_KEY_WAIT_TIMEOUT)
+        except FutureTimeoutError:
+            # Treated like a failed lookup rather than surfacing as a 500;
+            # the owner may still have cached its result in the meantime
+            logger.warning("Timed out waiting for AI settings lookup of user %s", user_id)
+            return _get_cached_settings(cache_key, user_id)
 
     try:
-        laravel_url = os.getenv("LARAVEL_API_URL", "http://laravel-app-dev:8000")
-
-        # Retry logic: try 3 times with increasing timeout
-        max_retries = 3
-        timeouts = [5, 10, 15]
-
-        for attempt in range(max_retries):
-            try:
-                print(f"Calling Laravel API (attempt {attempt + 1}/{max_retries})...")
-                response = requests.get(
-                    f"{laravel_url}/api/internal/ai-settings",
-                    params={"user_id": user_id},
-                    timeout=timeouts[attempt]
-                )
+        settings = _fetch_api_key_from_laravel(user_id, cache_key)
+        if settings is None:
+            with _api_key_cache_lock:
+                _api_key_miss_cache[cache_key] = True
+        future.set_result(settings)
+        return settings
+    finally:
+        if not future.done():
+            future.set_result(None)
+        with _api_key_cache_lock:
+            _api_key_inflight.pop(cache_key, None)
+
+def _redis_settings_key(user_id):
+    return f"ai:{user_id}"
+
+def _get_cached_settings(cache_key, user_id):
+    with _api_key_cache_lock:
+        cached_data = _api_key_cache.get(cache_key)
+    if cached_data is not None:
+        return cached_data
+
+    try:
+        raw = get_redis_client().get(_redis_settings_key(user_id))
+    except redis.RedisError as e:
+        logger.warning("Redis unavailable for AI settings cache: %s", e)
+        return None
+    if raw is None:
+        return None
+
+    cached_data = orjson.loads(raw)
+    with _api_key_cache_lock:
+        _api_key_cache[cache_key] = cached_data
+    return cached_data
 
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get('success'):
-                        # Cache the result
-                        _api_key_cache[cache_key] = (data['data'], time.time())
-                        print(f"Successfully fetched and cached API key for user {user_id}")
-                        return data['data']
-                else:
-                    print(f"Laravel API returned status {response.status_code}: {response.text}")
-
-                # If we get a response but it's not successful, don't retry
-                break
-
-            except requests.exceptions.Timeout:
-                print(f"Timeout on attempt {attempt + 1}/{max_retries}")
-                if attempt == max_retries - 1:
-                    raise
-                time.sleep(1)  # Wait 1 second before retry
-
-            except requests.exceptions.ConnectionError as e:
-                print(f"Connection error on attempt {attempt + 1}/{max_retries}: {e}")
-                if attempt == max_retries - 1:
-                    raise
-                time.sleep(1)
+def _cache_settings(cache_key, user_id, settings):
+    with _api_key_cache_lock:
+        _api_key_cache[cache_key] = settings
+    try:
+        get_redis_client().setex(_redis_settings_key(user_id), _cache_ttl, orjson.dumps(settings))
+    except redis.RedisError as e:
+        logger.warning("Could not store AI settings in Redis: %s", e)
+
+def _fetch_api_key_from_laravel(user_id, cache_key):
+    try:
+        logger.debug("Calling Laravel API for AI settings of user %s", user_id)
+        response = _laravel_call(
+            "GET",
+            _AI_SETTINGS_URL,
+            params={"user_id": user_id},
+            timeout=(_CONNECT_TIMEOUT, 10)
+        )
+
+        if response.status_code == 200:
+            data = orjson.loads(response.content)
+            if data.get('success'):
+                _cache_settings(cache_key, user_id, data['data'])
+                logger.info("Successfully fetched and cached API key for user %s", user_id)
+                return data['data']
+        else:
+            logger.warning("Laravel API returned status %s: %s", response.status_code, response.text)
 
         return None
 
     except Exception as e:
-        print(f"Error calling Laravel API: {e}")
+        logger.error("Error calling Laravel API: %s", e)
         return None
 
+# Invalidations are broadcast so every worker process drops its local copy,
+# not only the one that received the request from Laravel
+_SETTINGS_INVALIDATION_CHANNEL = "ai_settings:invalidate"
+
+def _forget_local_settings(user_id):
+    with _api_key_cache_lock:
+        _api_key_cache.pop(f"user_{user_id}", None)
+        _api_key_miss_cache.pop(f"user_{user_id}", None)
+
+def invalidate_llm_config(user_id):
+    """Forget the cached AI settings of a user so the next call re-reads them from Laravel."""
+    _forget_local_settings(user_id)
+    try:
+        client = get_redis_client()
+        client.delete(_redis_settings_key(user_id))
+        client.publish(_SETTINGS_INVALIDATION_CHANNEL, str(user_id))
+    except redis.RedisError as e:
+        logger.warning("Could not drop AI settings from Redis: %s", e)
+
+def _settings_listener_error(error, pubsub, thread):
+    logger.warning("AI settings invalidation listener error: %s", error)
+    time.sleep(1)
+
+def start_settings_invalidation_listener():
+    """
+    Subscribe to AI settings invalidations from other processes. Returns the
+    listener thread (stop() it on shutdown), or None if Redis is unavailable.
+    """
+    try:
+        pubsub = get_redis_client().pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{
+            _SETTINGS_INVALIDATION_CHANNEL: lambda message: _forget_local_settings(message['data'])
+        })
+    except redis.RedisError as e:
+        logger.warning("Could not subscribe to AI settings invalidations: %s", e)
+        return None
+    return pubsub.run_in_thread(sleep_time=1, daemon=True, exception_handler=_settings_listener_error)
+
+# Lower-case provider names from requests and Laravel settings, mapped to the
+# names used throughout the agents
+_PROVIDER_NAMES = {'openai': 'OpenAI', 'anthropic': 'Anthropic'}
+
+def _llm_config(provider, api_key):
+    # Built per call rather than memoized: a cache here would be keyed by
+    # the plain API key and keep it in memory after the key is rotated
+    return {'provider': provider, 'api_key': api_key}
+
 def get_llm_config(user_id=2, ai_provider=None, ai_api_key=None):
     """
     Get LLM configuration for a specific user.
@@ -87,32 +296,26 @@ def get_llm_config(user_id=2, ai_provider=None, ai_api_key=None):
     """
     # If AI settings are passed directly, use them (avoids circular API calls)
     if ai_provider and ai_api_key:
-        if ai_provider.lower() == 'openai':
-            return {'provider': 'OpenAI', 'api_key': ai_api_key}
-        elif ai_provider.lower() == 'anthropic':
-            return {'provider': 'Anthropic', 'api_key': ai_api_key}
+        provider = _PROVIDER_NAMES.get(ai_provider.lower())
+        if provider:
+            return _llm_config(provider, ai_api_key)
 
     # Otherwise, get decrypted keys from Laravel API (with caching)
     settings = get_api_key_from_laravel(user_id)
     if settings:
-        provider = settings['provider']
-        api_key = settings['api_key']
+        provider = _PROVIDER_NAMES.get(settings['provider'])
+        if provider:
+            return _llm_config(provider, settings['api_key'])
 
-        if provider == 'openai':
-            return {'provider': 'OpenAI', 'api_key': api_key}
-        elif provider == 'anthropic':
-            return {'provider': 'Anthropic', 'api_key': api_key}
-
-    print(f"WARNING: No AI configuration found for user {user_id}. Please configure AI settings at http://localhost:8000/settings/ai")
+    logger.warning("No AI configuration found for user %s. Please configure AI settings at http://localhost:8000/settings/ai", user_id)
     return None
 
-def save_conversation_metadata(user_id, thread_id, title=None, message_count=None, project_id=None):
+# Laravel writes, made from the FastAPI handlers on the event loop
+
+async def save_conversation_metadata_async(user_id, thread_id, title=None, message_count=None, project_id=None):
     """
-    Save or update conversation metadata in Laravel's MySQL database with retry logic.
-    The actual conversation messages are stored in Redis via LangGraph's RedisSaver.
+    Save or update conversation metadata without blocking the event loop.
     """
-    laravel_url = os.getenv("LARAVEL_API_URL", "http://laravel-app-dev:8000")
-
     payload = {
         'user_id': user_id,
         'thread_id': thread_id,
@@ -125,153 +328,52 @@ def save_conversation_metadata(user_id, thread_id, title=None, message_count=Non
     if project_id:
         payload['project_id'] = project_id
 
-    # Retry with increasing timeouts (10s, 15s, 20s)
-    max_retries = 3
-    timeouts = [10, 15, 20]
-
-    for attempt in range(max_retries):
-        try:
-            response = requests.post(
-                f"{laravel_url}/api/internal/conversations",
-                json=payload,
-                timeout=timeouts[attempt]
-            )
-
-            if response.status_code == 200:
-                print(f"Conversation metadata saved: {thread_id}")
-                return response.json().get('data')
-            else:
-                print(f"Failed to save conversation metadata: {response.status_code}")
-                if attempt < max_retries - 1:
-                    time.sleep(1)
-                    continue
-                return None
-
-        except requests.exceptions.Timeout:
-            print(f"Timeout saving conversation metadata on attempt {attempt + 1}/{max_retries} (timeout: {timeouts[attempt]}s)")
-            if attempt < max_retries - 1:
-                time.sleep(1)
-                continue
-            return None
-        except Exception as e:
-            print(f"Error saving conversation metadata: {e}")
-            if attempt < max_retries - 1:
-                time.sleep(1)
-                continue
-            return None
-
-    return None
-
-def save_requirements_to_laravel(thread_id, requirements):
-    """
-    Save requirements document to Laravel's MySQL database with retry logic.
-    """
-    laravel_url = os.getenv("LARAVEL_API_URL", "http://laravel-app-dev:8000")
-
-    payload = {
-        'thread_id': thread_id,
-        'requirements': requirements,
-    }
+    try:
+        body, headers = _encode_json_body(payload)
+        response = await laravel_request("POST", _CONVERSATIONS_PATH, content=body, headers=headers, timeout=20)
 
-    # Retry with increasing timeouts (30s, 45s, 60s)
-    max_retries = 3
-    timeouts = [30, 45, 60]
+        if response.status_code == 200:
+            logger.info("Conversation metadata saved: %s", thread_id)
+            return _response_data(response)
 
-    for attempt in range(max_retries):
-        try:
-            print(f"Saving requirements for thread {thread_id} (attempt {attempt + 1}/{max_retries}, length: {len(requirements)} chars)...")
-
-            response = requests.post(
-                f"{laravel_url}/api/internal/conversations/requirements",
-                json=payload,
-                timeout=timeouts[attempt]
-            )
-
-            if response.status_code == 200:
-                print(f"✓ Requirements saved successfully for thread {thread_id}")
-                return response.json().get('data')
-            else:
-                print(f"Failed to save requirements: {response.status_code} - {response.text}")
-                if attempt < max_retries - 1:
-                    time.sleep(2)  # Wait before retry
-                    continue
-                return None
-
-        except requests.exceptions.Timeout:
-            print(f"Timeout on attempt {attempt + 1}/{max_retries} (timeout: {timeouts[attempt]}s)")
-            if attempt < max_retries - 1:
-                time.sleep(2)
-                continue
-            print(f"✗ Failed to save requirements after {max_retries} attempts - TIMEOUT")
-            return None
-        except Exception as e:
-            print(f"Error saving requirements: {e}")
-            if attempt < max_retries - 1:
-                time.sleep(2)
-                continue
-            return None
+        logger.warning("Failed to save conversation metadata: %s", response.status_code)
+        return None
 
-    return None
+    except httpx.TimeoutException:
+        logger.warning("Timeout saving conversation metadata for thread %s", thread_id)
+        return None
+    except Exception as e:
+        logger.error("Error saving conversation metadata: %s", e)
+        return None
 
-def save_solution_to_laravel(thread_id, solution):
+async def save_conversation_metadata_bulk_async(items):
     """
-    Save solution document to Laravel's MySQL database with retry logic.
+    Update message counts of existing conversations in one request.
+    items: [{'thread_id': ..., 'message_count': ...}, ...]
     """
-    laravel_url = os.getenv("LARAVEL_API_URL", "http://laravel-app-dev:8000")
-
-    payload = {
-        'thread_id': thread_id,
-        'solution': solution,
-    }
+    try:
+        body, headers = _encode_json_body({'items': items})
+        response = await laravel_request("POST", _CONVERSATIONS_BULK_PATH, content=body, headers=headers, timeout=20)
 
-    # Retry with increasing timeouts (30s, 45s, 60s)
-    max_retries = 3
-    timeouts = [30, 45, 60]
+        if response.status_code == 200:
+            logger.debug("Conversation metadata saved for %s thread(s)", len(items))
+            return _response_data(response)
 
-    for attempt in range(max_retries):
-        try:
-            print(f"Saving solution for thread {thread_id} (attempt {attempt + 1}/{max_retries}, length: {len(solution)} chars)...")
-
-            response = requests.post(
-                f"{laravel_url}/api/internal/conversations/solution",
-                json=payload,
-                timeout=timeouts[attempt]
-            )
-
-            if response.status_code == 200:
-                print(f"✓ Solution saved successfully for thread {thread_id}")
-                return response.json().get('data')
-            else:
-                print(f"Failed to save solution: {response.status_code} - {response.text}")
-                if attempt < max_retries - 1:
-                    time.sleep(2)
-                    continue
-                return None
-
-        except requests.exceptions.Timeout:
-            print(f"Timeout on attempt {attempt + 1}/{max_retries} (timeout: {timeouts[attempt]}s)")
-            if attempt < max_retries - 1:
-                time.sleep(2)
-                continue
-            print(f"✗ Failed to save solution after {max_retries} attempts - TIMEOUT")
-            return None
-        except Exception as e:
-            print(f"Error saving solution: {e}")
-            if attempt < max_retries - 1:
-                time.sleep(2)
-                continue
-            return None
+        logger.warning("Failed to save conversation metadata batch: %s", response.status_code)
+        return None
 
-    return None
+    except httpx.TimeoutException:
+        logger.warning("Timeout saving conversation metadata for %s thread(s)", len(items))
+        return None
+    except Exception as e:
+        logger.error("Error saving conversation metadata batch: %s", e)
+        return None
 
-def create_solution(conversation_id, user_id, title, description=None, project_id=None):
+async def create_solution_async(conversation_id, user_id, title, description=None, project_id=None):
     """
-    Create a new solution for a conversation.
-    Called when a conversation starts.
+    Create a new solution for a conversation without blocking the event loop.
     """
     try:
-        laravel_url = os.getenv("LARAVEL_API_URL", "http://laravel-app-dev:8000")
-
         payload = {
             'conversation_id': conversation_id,
             'user_id': user_id,
@@ -281,163 +383,47 @@ def create_solution(conversation_id, user_id, title, description=None, project_i
             'status': 'in_progress',
         }
 
-        response = requests.post(
-            f"{laravel_url}/api/internal/solutions",
-            json=payload,
-            timeout=10
-        )
+        body, headers = _encode_json_body(payload)
+        response = await laravel_request("POST", _SOLUTIONS_PATH, content=body, headers=headers, timeout=10)
 
         if response.status_code in [200, 201]:
-            print(f"Solution created for conversation {conversation_id}")
-            return response.json().get('data')
+            logger.info("Solution created for conversation %s", conversation_id)
+            return _response_data(response)
         elif response.status_code == 409:
             # Solution already exists
-            print(f"Solution already exists for conversation {conversation_id}")
-            return response.json().get('data')
+            logger.info("Solution already exists for conversation %s", conversation_id)
+            return _response_data(response)
         else:
-            print(f"Failed to create solution: {response.status_code} - {response.text}")
+            logger.warning("Failed to create solution: %s - %s", response.status_code, response.text)
             return None
 
     except Exception as e:
-        print(f"Error creating solution: {e}")
+        logger.error("Error creating solution: %s", e)
         return None
 
-def update_solution_requirements(thread_id, requirements):
-    """
-    Update solution requirements during conversation with retry logic.
-    """
-    laravel_url = os.getenv("LARAVEL_API_URL", "http://laravel-app-dev:8000")
-
-    # Retry logic for getting conversation
-    max_retries = 3
-    timeouts = [30, 45, 60]
-
-    for attempt in range(max_retries):
-        try:
-            print(f"Updating solution requirements for thread {thread_id} (attempt {attempt + 1}/{max_retries}, length: {len(requirements)} chars)...")
-
-            # Get conversation with retry
-            response = requests.get(
-                f"{laravel_url}/api/internal/conversations/{thread_id}",
-                timeout=10
-            )
-
-            if response.status_code != 200:
-                print(f"Failed to find conversation: {response.status_code}")
-                if attempt < max_retries - 1:
-                    time.sleep(2)
-                    continue
-                return None
-
-            conversation = response.json().get('data')
-            if not conversation:
-                print(f"Conversation not found: {conversation_id}")
-                return None
-
-            # Update requirements via conversation_id
-            payload = {
-                'conversation_id': conversation['id'],
-                'requirements': requirements,
-            }
-
-            response = requests.put(
-                f"{laravel_url}/api/internal/solutions/by-conversation",
-                json=payload,
-                timeout=timeouts[attempt]
-            )
-
-            if response.status_code == 200:
-                print(f"✓ Solution requirements updated successfully for conversation {conversation_id}")
-                return response.json().get('data')
-            else:
-                print(f"Failed to update solution requirements: {response.status_code} - {response.text}")
-                if attempt < max_retries - 1:
-                    time.sleep(2)
-                    continue
-                return None
-
-        except requests.exceptions.Timeout:
-            print(f"Timeout on attempt {attempt + 1}/{max_retries} (timeout: {timeouts[attempt]}s)")
-            if attempt < max_retries - 1:
-                time.sleep(2)
-                continue
-            print(f"✗ Failed to update solution requirements after {max_retries} attempts - TIMEOUT")
-            return None
-        except Exception as e:
-            print(f"Error updating solution requirements: {e}")
-            if attempt < max_retries - 1:
-                time.sleep(2)
-                continue
-            return None
+async def _post_document_async(path, thread_id, field, document, label):
+    """POST a requirements/solution document for a thread, returning the saved data or None."""
+    try:
+        logger.debug("Saving %s for thread %s (length: %s chars)", label, thread_id, len(document))
 
-    return None
+        body, headers = _encode_json_body({'thread_id': thread_id, field: document})
+        response = await laravel_request("POST", path, content=body, headers=headers, timeout=60)
 
-def update_solution_technical(thread_id, technical_solution):
-    """
-    Update solution technical solution during conversation with retry logic.
-    """
-    laravel_url = os.getenv("LARAVEL_API_URL", "http://laravel-app-dev:8000")
+        if response.status_code == 200:
+            logger.info("%s saved successfully for thread %s", label.capitalize(), thread_id)
+            return _response_data(response)
 
-    # Retry logic
-    max_retries = 3
-    timeouts = [30, 45, 60]
+        logger.warning("Failed to save %s: %s - %s", label, response.status_code, response.text)
+        return None
 
-    for attempt in range(max_retries):
-        try:
-            print(f"Updating technical solution for thread {thread_id} (attempt {attempt + 1}/{max_retries}, length: {len(technical_solution)} chars)...")
-
-            # Get conversation with retry
-            response = requests.get(
-                f"{laravel_url}/api/internal/conversations/{thread_id}",
-                timeout=10
-            )
-
-            if response.status_code != 200:
-                print(f"Failed to find conversation: {response.status_code}")
-                if attempt < max_retries - 1:
-                    time.sleep(2)
-                    continue
-                return None
-
-            conversation = response.json().get('data')
-            if not conversation:
-                print(f"Conversation not found: {conversation_id}")
-                return None
-
-            # Update technical solution via conversation_id
-            payload = {
-                'conversation_id': conversation['id'],
-                'technical_solution': technical_solution,
-            }
-
-            response = requests.put(
-                f"{laravel_url}/api/internal/solutions/by-conversation/technical",
-                json=payload,
-                timeout=timeouts[attempt]
-            )
-
-            if response.status_code == 200:
-                print(f"✓ Technical solution updated successfully for conversation {conversation_id}")
-                return response.json().get('data')
-            else:
-                print(f"Failed to update technical solution: {response.status_code} - {response.text}")
-                if attempt < max_retries - 1:
-                    time.sleep(2)
-                    continue
-                return None
-
-        except requests.exceptions.Timeout:
-            print(f"Timeout on attempt {attempt + 1}/{max_retries} (timeout: {timeouts[attempt]}s)")
-            if attempt < max_retries - 1:
-                time.sleep(2)
-                continue
-            print(f"✗ Failed to update technical solution after {max_retries} attempts - TIMEOUT")
-            return None
-        except Exception as e:
-            print(f"Error updating technical solution: {e}")
-            if attempt < max_retries - 1:
-                time.sleep(2)
-                continue
-            return None
+    except httpx.TimeoutException:
+        logger.error("Failed to save %s for thread %s - TIMEOUT", label, thread_id)
+        return None
+    except Exception as e:
+        logger.error("Error saving %s: %s", label, e)
+        return None
 
-    return None
+async def save_solution_to_laravel_async(thread_id, solution):
+    return await _post_document_async(
+        _SOLUTION_DOCUMENT_PATH, thread_id, 'solution', solution, "solution"
+    )
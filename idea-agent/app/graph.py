@@ -1,11 +1,17 @@
 from typing import TypedDict, Annotated, List
 from langgraph.graph import StateGraph, END
-from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, ToolMessage
+from langchain_core.messages import BaseMessage, ToolMessage
 from langchain_core.runnables import RunnableConfig
-from app.agents.requirement_agent import get_requirement_agent
+from app.agents.requirement_agent import (
+    FAST_MODELS,
+    REQUIREMENT_PROMPT_VERSION,
+    get_requirement_agent,
+    resolve_llm_config,
+)
+from app.response_cache import cache_response, get_cached_response
 from app.tools.memory_tool import save_requirements
 from app.tools.rag_tool import search_knowledge_base
-from langchain_core.tools import Tool
+from pydantic import ValidationError
 import operator
 import os
 
@@ -23,72 +29,112 @@ def requirement_node(state: AgentState, config: RunnableConfig):
     # Set agent type for KB integration
     agent_type = "requirement_agent"
 
+    # A save_requirements call that failed validation gets exactly one retry
+    # on an agent whose reply is forced to be that tool call
+    force_save = state.get("next_step") == "retry_save"
+
     agent = get_requirement_agent(
         user_id=user_id,
         ai_provider=ai_provider,
         ai_api_key=ai_api_key,
-        agent_type=agent_type
+        agent_type=agent_type,
+        force_save=force_save
     )
     messages = state['messages']
-    response = agent.invoke(messages)
-    return {"messages": [response], "current_agent": "requirement_agent"}
+
+    # Replies depend only on the prompt, the model and the history, so the
+    # cache is shared across users; forced saves always go to the model.
+    # Scoped by the resolved provider and model: requests relying on the
+    # stored Laravel settings carry no ai_provider of their own.
+    provider = resolve_llm_config(user_id=user_id, ai_provider=ai_provider, ai_api_key=ai_api_key)['provider']
+    cache_scope = [agent_type, provider, FAST_MODELS[provider], REQUIREMENT_PROMPT_VERSION]
+    response = None if force_save else get_cached_response(cache_scope, messages)
+    if response is None:
+        response = agent.invoke(messages)
+        if not force_save:
+            cache_response(cache_scope, messages, response)
+
+    return {
+        "messages": [response],
+        "current_agent": "requirement_agent",
+        "next_step": "forced_save" if force_save else "agent"
+    }
+
+# Tools the graph can run, by the name the model calls them with
+_TOOLS = {
+    tool.name: tool
+    for tool in (save_requirements, search_knowledge_base)
+}
+
+def run_tool_call(tool_call, config, current_agent):
+    tool_name = tool_call['name']
+    tool_args = tool_call['args']
+    tool_call_id = tool_call['id']
+
+    tool = _TOOLS.get(tool_name)
+    if tool is None:
+        # Handle unknown tools with an error message
+        return ToolMessage(
+            content=f"Error: Unknown tool '{tool_name}'",
+            tool_call_id=tool_call_id
+        )
+
+    if tool_name == 'save_requirements':
+        # Add thread_id to tool args
+        # Note: Developer agent will be triggered manually via separate endpoint
+        tool_args['thread_id'] = config.get("configurable", {}).get("thread_id")
+    elif tool_name == 'search_knowledge_base':
+        # Inject agent_type for KB context
+        tool_args['agent_type'] = current_agent
+
+    try:
+        # The run config is passed through so the search can reach the user's AI settings
+        result = tool.invoke(tool_args, config)
+    except ValidationError as e:
+        return ToolMessage(
+            content=(
+                f"Error: invalid {tool_name} arguments: {e}. "
+                f"Call {tool_name} again with complete, valid arguments."
+            ),
+            tool_call_id=tool_call_id,
+            status="error"
+        )
+    return ToolMessage(content=str(result), tool_call_id=tool_call_id)
 
 # Tools execution node - simplified for requirements gathering only
 def tool_node(state: AgentState, config: RunnableConfig):
     messages = state['messages']
     last_message = messages[-1]
 
-    if isinstance(last_message, AIMessage) and last_message.tool_calls:
-        # Get thread_id and current_agent from config/state
-        thread_id = config.get("configurable", {}).get("thread_id")
+    tool_calls = getattr(last_message, "tool_calls", None)
+    if tool_calls:
+        # Get current_agent from state
         current_agent = state.get('current_agent', 'requirement_agent')
 
         # Process ALL tool calls
-        tool_messages = []
+        tool_messages = [
+            run_tool_call(tool_call, config, current_agent)
+            for tool_call in tool_calls
+        ]
+
         next_step = "end"  # End conversation after saving requirements
 
-        for tool_call in last_message.tool_calls:
-            tool_name = tool_call['name']
-            tool_args = tool_call['args']
-            tool_call_id = tool_call['id']
-
-            if tool_name == 'save_requirements':
-                # Add thread_id to tool args
-                tool_args['thread_id'] = thread_id
-                result = save_requirements.invoke(tool_args)
-                tool_messages.append(ToolMessage(content=str(result), tool_call_id=tool_call_id))
-                # Note: Developer agent will be triggered manually via separate endpoint
-            elif tool_name == 'search_knowledge_base':
-                # Inject agent_type for KB context
-                tool_args['agent_type'] = current_agent
-                result = search_knowledge_base.invoke(tool_args)
-                tool_messages.append(ToolMessage(content=str(result), tool_call_id=tool_call_id))
-            else:
-                # Handle unknown tools with an error message
-                tool_messages.append(
-                    ToolMessage(
-                        content=f"Error: Unknown tool '{tool_name}'",
-                        tool_call_id=tool_call_id
-                    )
-                )
+        # Retry a rejected save once; a second rejection ends the run as before
+        save_failed = any(
+            tool_call['name'] == 'save_requirements' and message.status == "error"
+            for tool_call, message in zip(tool_calls, tool_messages)
+        )
+        if save_failed and state.get("next_step") != "forced_save":
+            next_step = "retry_save"
 
         return {"messages": tool_messages, "next_step": next_step}
 
     return {"messages": []}
 
-workflow = StateGraph(AgentState)
-
-# Add only requirement agent and tools nodes
-workflow.add_node("requirement_agent", requirement_node)
-workflow.add_node("tools", tool_node)
-
-# Set entry point - always start with requirement agent
-workflow.set_entry_point("requirement_agent")
-
 # Define conditional routing for requirement agent
 def requirement_conditional(state: AgentState):
-    last_message = state['messages'][-1]
-    if isinstance(last_message, AIMessage) and last_message.tool_calls:
+    # Only AI messages carry tool_calls, so the attribute alone decides the route
+    if getattr(state['messages'][-1], "tool_calls", None):
         return "tools"  # Go to tools if agent wants to call a tool
     return END  # End conversation and wait for user input
 
@@ -96,41 +142,89 @@ def requirement_conditional(state: AgentState):
 def tool_conditional(state: AgentState):
     if state.get("next_step") == "end":
         return END  # End conversation after saving requirements
-    return "requirement_agent"  # Continue with requirement agent if needed
-
-# Simplified workflow:
-# 1. Start with Requirement Agent
-# 2. User converses through 7 stages
-# 3. Requirement Agent calls save_requirements tool
-# 4. Conversation ends
-# 5. Developer Agent is triggered MANUALLY via separate /publish endpoint
-
-workflow.add_conditional_edges(
-    "requirement_agent",
-    requirement_conditional,
-    {
-        "tools": "tools",
-        END: END
-    }
-)
+    return "requirement_agent"  # Continue with requirement agent (e.g. "retry_save")
+
+def build_graph(checkpointer):
+    """
+    Compile the conversation workflow with the given checkpointer.
+
+    Simplified workflow:
+    1. Start with Requirement Agent
+    2. User converses through 7 stages
+    3. Requirement Agent calls save_requirements tool
+    4. Conversation ends
+    5. Developer Agent is triggered MANUALLY via separate /publish endpoint
+    """
+    workflow = StateGraph(AgentState)
+
+    # Add only requirement agent and tools nodes
+    workflow.add_node("requirement_agent", requirement_node)
+    workflow.add_node("tools", tool_node)
+
+    # Set entry point - always start with requirement agent
+    workflow.set_entry_point("requirement_agent")
+
+    workflow.add_conditional_edges(
+        "requirement_agent",
+        requirement_conditional,
+        {
+            "tools": "tools",
+            END: END
+        }
+    )
 
-workflow.add_conditional_edges(
-    "tools",
-    tool_conditional,
-    {
-        "requirement_agent": "requirement_agent",
-        END: END
-    }
-)
+    workflow.add_conditional_edges(
+        "tools",
+        tool_conditional,
+        {
+            "requirement_agent": "requirement_agent",
+            END: END
+        }
+    )
+
+    return workflow.compile(checkpointer=checkpointer)
 
 # Use RedisSaver for persistent conversation storage across restarts
 from langgraph.checkpoint.redis import RedisSaver
+from importlib import metadata
+import redis
 
-# Initialize RedisSaver with Redis connection string
+# Checkpoints are read and written on every turn from the request threads,
+# so the saver gets its own bounded pool (binary responses, unlike the
+# decode_responses client in app.redis_client)
 redis_url = os.getenv("REDIS_URL", "redis://redis:6379")
-checkpointer = RedisSaver(redis_url)
-
-# Ensure Redis Search indices are created
-checkpointer.setup()
-
-app_graph = workflow.compile(checkpointer=checkpointer)
+# Keepalive plus a periodic health check stop a pooled connection that the
+# network silently dropped from costing a failed round trip and a reconnect
+checkpoint_pool = redis.ConnectionPool.from_url(
+    redis_url,
+    max_connections=int(os.getenv("CHECKPOINT_REDIS_MAX_CONNECTIONS", "64")),
+    socket_keepalive=True,
+    health_check_interval=30
+)
+checkpoint_redis = redis.Redis(connection_pool=checkpoint_pool)
+checkpointer = RedisSaver(redis_client=checkpoint_redis)
+
+def _setup_checkpointer():
+    """
+    Create the Redis Search indices once per checkpointer version.
+
+    setup() issues several index commands; a marker key lets every later
+    worker boot skip them with a single EXISTS, and the lock keeps workers
+    starting at once from racing on index creation.
+    """
+    try:
+        version = metadata.version("langgraph-checkpoint-redis")
+    except metadata.PackageNotFoundError:
+        version = "unknown"
+    marker = f"idea-agent:checkpoint-setup:{version}"
+
+    if checkpoint_redis.exists(marker):
+        return
+    with checkpoint_redis.lock("idea-agent:checkpoint-setup", timeout=60, blocking_timeout=60):
+        if not checkpoint_redis.exists(marker):
+            checkpointer.setup()
+            checkpoint_redis.set(marker, 1)
+
+_setup_checkpointer()
+
+app_graph = build_graph(checkpointer)
@@ -0,0 +1,135 @@
+"""
+Shared async HTTP client for the Laravel internal API.
+
+Used from the FastAPI handlers so persistence calls to Laravel do not block
+the event loop. Connections are kept alive between calls and in-flight
+requests are capped so a burst of conversations cannot exhaust the
+Laravel workers.
+"""
+from dotenv import load_dotenv
+from tenacity import (
+    retry,
+    retry_if_exception_type,
+    retry_if_result,
+    stop_after_attempt,
+    wait_exponential_jitter,
+)
+import asyncio
+import os
+import threading
+import time
+import httpx
+
+load_dotenv()
+
+LARAVEL_API_URL = os.getenv("LARAVEL_API_URL", "http://laravel-app-dev:8000")
+
+# Upper bound on concurrent requests to Laravel from this process
+LARAVEL_MAX_IN_FLIGHT = 8
+
+ASYNC_CLIENT = httpx.AsyncClient(
+    base_url=LARAVEL_API_URL,
+    timeout=httpx.Timeout(30.0, connect=2.0),
+    transport=httpx.AsyncHTTPTransport(
+        http2=True,
+        limits=httpx.Limits(max_connections=32, max_keepalive_connections=16)
+    )
+)
+
+# Same policy as the sync requests.Session: up to 3 attempts on connection
+# errors, timeouts and gateway errors. Exponential backoff with jitter keeps
+# concurrent agents from retrying in lockstep during a Laravel brownout.
+RETRY_STATUSES = (502, 503, 504)
+_RETRY_POLICY = dict(
+    wait=wait_exponential_jitter(initial=0.5, max=30),
+    stop=stop_after_attempt(3),
+    retry=(
+        retry_if_exception_type((httpx.TimeoutException, httpx.TransportError))
+        | retry_if_result(lambda response: response.status_code in RETRY_STATUSES)
+    ),
+    # Hand back the last response (or raise the last error) once retries run out
+    retry_error_callback=lambda retry_state: retry_state.outcome.result(),
+)
+
+class LaravelUnavailable(Exception):
+    """Raised instead of calling Laravel while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Fail fast after repeated Laravel failures instead of letting every turn
+    wait through timeouts and retries during an outage.
+
+    After `threshold` consecutive failures (transport errors or 5xx) the
+    circuit opens for `cooldown` seconds; after that calls go through again
+    and the first success closes it, while another failure reopens it.
+    Shared by the sync session in app.database and the async client here.
+    """
+
+    def __init__(self, threshold=5, cooldown=30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self._failures >= self.threshold and time.monotonic() - self._opened_at < self.cooldown:
+                raise LaravelUnavailable("Laravel API circuit is open, skipping call")
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+
+    def record_status(self, status_code):
+        if status_code >= 500:
+            self.record_failure()
+        else:
+            self.record_success()
+
+
+LARAVEL_CIRCUIT = CircuitBreaker(
+    threshold=int(os.getenv("LARAVEL_CIRCUIT_THRESHOLD", "5")),
+    cooldown=float(os.getenv("LARAVEL_CIRCUIT_COOLDOWN", "30")),
+)
+
+# Created on first use so it binds to the running event loop (Python 3.9)
+_semaphore = None
+
+
+def _laravel_semaphore():
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(LARAVEL_MAX_IN_FLIGHT)
+    return _semaphore
+
+
+async def laravel_request(method, path, **kwargs) -> httpx.Response:
+    """Send a request to the Laravel internal API, e.g. laravel_request("POST", "/api/internal/solutions", json=...)."""
+    LARAVEL_CIRCUIT.before_call()
+    try:
+        response = await _laravel_request_with_retry(method, path, **kwargs)
+    except (httpx.TimeoutException, httpx.TransportError):
+        LARAVEL_CIRCUIT.record_failure()
+        raise
+    LARAVEL_CIRCUIT.record_status(response.status_code)
+    return response
+
+
+@retry(**_RETRY_POLICY)
+async def _laravel_request_with_retry(method, path, **kwargs) -> httpx.Response:
+    # The semaphore is held per attempt, not while backing off
+    async with _laravel_semaphore():
+        return await ASYNC_CLIENT.request(method, path, **kwargs)
+
+
+async def aclose_laravel_client():
+    """Close the Laravel client; call from the application shutdown hook."""
+    await ASYNC_CLIENT.aclose()
@@ -0,0 +1,48 @@
+"""
+Logging setup for the idea-agent.
+
+Records are put on a queue by a QueueHandler on the calling thread; a
+QueueListener thread formats them and writes to stdout, so request and
+graph threads never block on console I/O.
+"""
+import atexit
+import logging
+import logging.config
+import logging.handlers
+import os
+import queue
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+_listener = None
+
+
+def configure_logging():
+    """Install the queue-based root handler once per process (LOG_LEVEL, default INFO)."""
+    global _listener
+    if _listener is not None:
+        return
+
+    log_queue = queue.Queue(-1)
+
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    logging.config.dictConfig({
+        "version": 1,
+        "disable_existing_loggers": False,
+        "handlers": {
+            "queue": {
+                "class": "logging.handlers.QueueHandler",
+                "queue": log_queue,
+            },
+        },
+        "root": {
+            "level": os.getenv("LOG_LEVEL", "INFO").upper(),
+            "handlers": ["queue"],
+        },
+    })
+
+    _listener = logging.handlers.QueueListener(log_queue, console, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
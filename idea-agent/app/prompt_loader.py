@@ -0,0 +1,9 @@
+from functools import lru_cache
+from pathlib import Path
+
+PROMPTS_DIR = Path(__file__).resolve().parent / "prompts"
+
+@lru_cache(maxsize=None)
+def load_prompt(name: str) -> str:
+    """Read a prompt file from app/prompts once per process."""
+    return (PROMPTS_DIR / name).read_text(encoding="utf-8")
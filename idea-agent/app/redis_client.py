@@ -0,0 +1,28 @@
+"""
+Shared Redis client for the idea-agent's own keys (the LangGraph checkpointer
+and the vector store manage their own connections).
+"""
+from typing import Optional
+import os
+import redis
+
+# Global Redis client
+_redis_client: Optional[redis.Redis] = None
+
+
+def get_redis_client() -> redis.Redis:
+    """
+    Get or create Redis client
+
+    Returns:
+        Redis client instance
+    """
+    global _redis_client
+
+    if _redis_client is None:
+        _redis_client = redis.from_url(
+            os.getenv("REDIS_URL", "redis://redis:6379"),
+            decode_responses=True
+        )
+
+    return _redis_client
@@ -0,0 +1,83 @@
+"""
+Exact-match response cache for agent turns.
+
+Identical conversations (same system prompt, same model, same message
+history) get the same answer from Redis instead of another LLM round trip.
+Only plain text replies are cached; a reply that calls a tool always goes
+to the model. Disabled unless AGENT_RESPONSE_CACHE_TTL is set (seconds).
+
+Only the opening turns of a conversation realistically repeat across users,
+so histories longer than AGENT_RESPONSE_CACHE_MAX_MESSAGES are neither
+looked up nor stored; otherwise every later turn would write an entry that
+can never be hit again.
+
+There is deliberately no embedding-similarity fallback: in a multi-turn
+interview short replies such as "yes" or "looks good" mean different things
+in different conversations, so a near-duplicate match would return answers
+to someone else's question.
+"""
+from langchain_core.messages import messages_from_dict, message_to_dict
+from app.redis_client import get_redis_client
+import hashlib
+import orjson
+import os
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_TTL = int(os.getenv("AGENT_RESPONSE_CACHE_TTL", "0"))
+RESPONSE_CACHE_MAX_MESSAGES = int(os.getenv("AGENT_RESPONSE_CACHE_MAX_MESSAGES", "3"))
+_KEY_PREFIX = "agent_response:"
+
+
+def _cache_key(scope, messages):
+    # Message ids and metadata differ between otherwise identical turns, so
+    # only role, content and tool calls take part in the key.
+    history = [
+        {
+            "type": message.type,
+            "content": message.content,
+            "tool_calls": [
+                {"name": tool_call["name"], "args": tool_call["args"]}
+                for tool_call in getattr(message, "tool_calls", None) or []
+            ],
+        }
+        for message in messages
+    ]
+    payload = orjson.dumps({"scope": scope, "messages": history}, option=orjson.OPT_SORT_KEYS, default=str)
+    return _KEY_PREFIX + hashlib.sha256(payload).hexdigest()
+
+
+def get_cached_response(scope, messages):
+    """Return the cached reply for this conversation, or None."""
+    if RESPONSE_CACHE_TTL <= 0 or len(messages) > RESPONSE_CACHE_MAX_MESSAGES:
+        return None
+    try:
+        cached = get_redis_client().get(_cache_key(scope, messages))
+    except Exception as e:
+        logger.warning("Response cache lookup failed: %s", e)
+        return None
+    if cached is None:
+        return None
+    response = messages_from_dict([orjson.loads(cached)])[0]
+    # Replies are shared across users and threads; each replay is a new
+    # message in its thread, so it must not reuse the original message's id
+    response.id = str(uuid.uuid4())
+    return response
+
+
+def cache_response(scope, messages, response):
+    """Store a plain text reply for this conversation."""
+    if RESPONSE_CACHE_TTL <= 0 or len(messages) > RESPONSE_CACHE_MAX_MESSAGES:
+        return
+    if getattr(response, "tool_calls", None) or not response.content:
+        return
+    try:
+        get_redis_client().setex(
+            _cache_key(scope, messages),
+            RESPONSE_CACHE_TTL,
+            orjson.dumps(message_to_dict(response))
+        )
+    except Exception as e:
+        logger.warning("Response cache store failed: %s", e)
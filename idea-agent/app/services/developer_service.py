@@ -2,26 +2,149 @@
 Developer Service - Manual Deep-Dive Technical Architect
 
 This service is triggered MANUALLY when user clicks "Publish" or "Republish".
-Uses intelligent thinking models (GPT-4o or Claude Opus) for comprehensive analysis.
+Fast models (GPT-4o-mini or Claude Haiku) draft the implementation phases;
+intelligent thinking models (GPT-4o or Claude Opus) write the executive summary.
 """
 
-from langchain_openai import ChatOpenAI
-from langchain_anthropic import ChatAnthropic
-from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.messages import HumanMessage, SystemMessage
+from app.agents.requirement_agent import anthropic_cache_control, build_system_message, chunk_text, create_llm
 from app.database import get_llm_config
-from app.tools.rag_tool import search_knowledge_base
-import json
-
-
-def get_developer_llm(user_id=2, ai_provider=None, ai_api_key=None):
+from app.prompt_loader import load_prompt
+from app.solution_cache import SOLUTION_CACHE_TTL, cache_solution, embed_requirements, find_cached_solution
+import asyncio
+import logging
+import re
+from cachetools import TTLCache
+from typing import Literal
+
+logger = logging.getLogger(__name__)
+
+# Comprehensive system prompt for A-Z implementation guide. Static, so it is
+# sent as a cacheable prefix: an explicit cache_control breakpoint on
+# Anthropic, automatic prefix caching on OpenAI.
+TECHNICAL_SOLUTION_SYSTEM_PROMPT = load_prompt("technical_solution.md")
+
+# GPT-4o for the best intelligence at reasonable cost; Claude Opus for deep
+# thinking and comprehensive analysis
+DEVELOPER_MODELS = {
+    'OpenAI': 'gpt-4o',
+    'Anthropic': 'claude-opus-4-20250514',
+}
+
+# Fast, cheap models for drafting the phases, which make up most of the
+# output and are largely scaffolding code
+FAST_DEVELOPER_MODELS = {
+    'OpenAI': 'gpt-4o-mini',
+    'Anthropic': 'claude-haiku-4-5',
+}
+
+_TIER_MODELS = {
+    'smart': DEVELOPER_MODELS,
+    'fast': FAST_DEVELOPER_MODELS,
+}
+
+# The system prompt is the same for every publish of every user, so on
+# Anthropic it is cached for an hour rather than the default 5 minutes
+_SYSTEM_MESSAGES = {
+    provider: build_system_message(provider, TECHNICAL_SOLUTION_SYSTEM_PROMPT, cache_ttl="1h")
+    for provider in DEVELOPER_MODELS
+}
+
+# Clients for Anthropic send the extended cache TTL beta header, which the
+# "1h" cache_control blocks above and in _requirements_block require
+_PROVIDER_LLM_KWARGS = {
+    'Anthropic': {'extended_cache_ttl': True},
+}
+
+# Threads published within the last hour. A thread's requirements block is
+# only worth the pricier 1 hour cache write once it is being republished;
+# a first publish keeps the 5 minute cache, which covers its own section calls.
+_recent_publishes = TTLCache(maxsize=4096, ttl=3600)
+
+SOLUTION_TITLE = "# Technical Implementation Guide\n*Enterprise Laravel Application - Complete A-Z Guide*"
+
+# Written last by the smart tier, from the requirements and an outline of
+# the drafted phases
+SOLUTION_SUMMARY_SECTION = (
+    "## 📋 EXECUTIVE SUMMARY",
+    "Project overview, technology stack decision matrix and architecture decision records. "
+    "Reconcile the technology choices made in the phase outline below."
+)
+
+# (heading, focus) of each phase of the guide, in document order. Every
+# phase is drafted by its own fast-tier LLM call; the headings match the
+# structure in the system prompt.
+SOLUTION_SECTIONS = [
+    ("## 🏗️ PHASE 1: PROJECT FOUNDATION (Week 1)",
+     "Development environment, Docker setup, CI/CD pipeline, directory structure and core configuration."),
+    ("## 🗄️ PHASE 2: DATABASE ARCHITECTURE (Week 1-2)",
+     "Entity-relationship analysis, every migration, seeders, indexing and query optimization."),
+    ("## 🚀 PHASE 3: CORE APPLICATION DEVELOPMENT (Week 2-4)",
+     "Authentication, authorization and the core business modules with their services."),
+    ("## 📡 PHASE 4: API DEVELOPMENT (Week 3-4)",
+     "API versioning, the full endpoint specification, controllers, form requests, resources and response standards."),
+    ("## 🔒 PHASE 5: SECURITY IMPLEMENTATION (Week 4-5)",
+     "OWASP Top 10 mitigation, rate limiting, XSS and CSRF protection and the other security measures."),
+    ("## ⚡ PHASE 6: PERFORMANCE OPTIMIZATION (Week 5-6)",
+     "Database optimization, caching strategy, queues and scaling."),
+    ("## 🧪 PHASE 7: TESTING (Week 6-7)",
+     "Testing strategy with complete unit, feature and integration test examples."),
+    ("## 🚀 PHASE 8: DEPLOYMENT (Week 7-8)",
+     "Production checklist, server setup, deployment pipeline and rollback strategy."),
+    ("## 📊 MONITORING & MAINTENANCE",
+     "Monitoring setup, followed by the appendices: code standards, git workflow, troubleshooting, "
+     "performance benchmarks and security audit checklist."),
+]
+
+
+# Cheap gate in front of the expensive generation: obviously empty input is
+# rejected outright, anything else is checked by a fast-tier yes/no call on
+# the beginning of the document
+MIN_REQUIREMENTS_WORDS = 20
+_REQUIREMENTS_CHECK_CHARS = 2000
+_REQUIREMENTS_CHECK_PROMPT = SystemMessage(content=(
+    "Reply with only yes or no: is the following a software requirements "
+    "document describing at least one feature?"
+))
+_VAGUE_REQUIREMENTS_ERROR = (
+    "Requirements are too vague to generate a technical solution. "
+    "Please complete the requirements conversation first."
+)
+
+
+# Output budgets: a single section of the guide, and the whole guide when it
+# is streamed as one completion
+SECTION_MAX_TOKENS = 8000
+DOCUMENT_MAX_TOKENS = 16000
+
+# A section ends where the next one would start; stop there if the model
+# runs on into the following section. The template separates sections with
+# "\n---\n\n## " (the tight form is matched as well). The last section is
+# never stopped: its focus asks for the appendices, which follow it as
+# another "## " section.
+_SECTION_STOP = ["\n---\n\n## ", "\n---\n## "]
+
+
+def _section_stop(heading):
+    return None if heading == SOLUTION_SECTIONS[-1][0] else _SECTION_STOP
+
+
+def get_developer_llm(user_id=2, ai_provider=None, ai_api_key=None, tier: Literal["fast", "smart"] = "smart",
+                      max_tokens: int = SECTION_MAX_TOKENS):
     """
-    Get the most intelligent and cost-effective model for deep technical analysis.
+    Get the model for deep technical analysis.
 
-    Prioritizes:
+    tier="smart" prioritizes:
     - OpenAI: GPT-4o (best balance of intelligence and cost)
     - Anthropic: Claude Opus (best for deep thinking and analysis)
+
+    tier="fast" returns GPT-4o-mini or Claude Haiku for bulk drafting.
     """
+    config = _developer_config(user_id=user_id, ai_provider=ai_provider, ai_api_key=ai_api_key)
+    return _developer_llm(config, tier, max_tokens)
+
+
+def _developer_config(user_id=2, ai_provider=None, ai_api_key=None):
     config = get_llm_config(user_id=user_id, ai_provider=ai_provider, ai_api_key=ai_api_key)
 
     if not config:
@@ -29,25 +152,20 @@ def get_developer_llm(user_id=2, ai_provider=None, ai_api_key=None):
             "AI configuration not found. Please configure your AI settings at "
             "http://localhost:8000/settings/ai with your OpenAI or Anthropic API key."
         )
+    return config
 
-    if config['provider'] == 'OpenAI':
-        # Use GPT-4o for best intelligence at reasonable cost
-        return ChatOpenAI(
-            api_key=config['api_key'],
-            model="gpt-4o",
-            temperature=0.3,  # Lower temperature for more focused, technical output
-            max_tokens=16000   # Allow long responses for detailed documentation
-        )
-    elif config['provider'] == 'Anthropic':
-        # Use Claude Opus for deep thinking and comprehensive analysis
-        return ChatAnthropic(
-            api_key=config['api_key'],
-            model="claude-opus-4-20250514",  # Latest Opus model
-            temperature=0.3,
-            max_tokens=16000
-        )
 
-    raise ValueError(f"Unsupported AI provider: {config['provider']}")
+def _developer_llm(config, tier="smart", max_tokens=SECTION_MAX_TOKENS):
+    # Cached per provider/key/model/max_tokens, so repeated publishes reuse
+    # the same client (and its connection pool). Lower temperature keeps the
+    # output focused; max_tokens is sized to what one call has to write.
+    return create_llm(
+        config,
+        model=_TIER_MODELS[tier].get(config['provider']),
+        temperature=0.3,
+        max_tokens=max_tokens,
+        **_PROVIDER_LLM_KWARGS.get(config['provider'], {})
+    )
 
 
 async def generate_technical_solution(
@@ -62,6 +180,12 @@ async def generate_technical_solution(
     Generate comprehensive A-Z technical implementation guide.
 
     This is the MAIN function called when user clicks "Publish" or "Republish".
+    Each phase of the guide (see SOLUTION_SECTIONS) is drafted by its own
+    fast-tier LLM call and the calls run concurrently, so the wall-clock time
+    is that of the longest phase rather than of the whole document. The smart
+    tier then writes only the executive summary, from an outline of the phases.
+    Requirements close to ones published before are served from the semantic
+    solution cache (app.solution_cache) unless this is a republish.
 
     Args:
         thread_id: Conversation thread ID
@@ -72,787 +196,318 @@ async def generate_technical_solution(
         is_republish: Whether this is a republish (regeneration) request
 
     Returns:
-        dict: Contains technical_solution (markdown), metadata, and status
+        dict: Contains technical_solution (markdown), its sections, metadata, and status
     """
 
-    # Get intelligent LLM
-    llm = get_developer_llm(user_id=user_id, ai_provider=ai_provider, ai_api_key=ai_api_key)
-
-    # Comprehensive system prompt for A-Z implementation guide
-    system_prompt = r"""You are an ELITE Laravel Solution Architect and Technical Lead with 15+ years of experience. You've architected and delivered 100+ enterprise Laravel applications.
-
-Your mission: Create a COMPREHENSIVE, A-Z, step-by-step implementation guide that a development team can follow to build the application from SCRATCH to PRODUCTION.
-
-## YOUR EXPERTISE:
-- Laravel Best Practices (PSR standards, SOLID principles, design patterns)
-- Enterprise Architecture (Scalability, Performance, Security)
-- Database Design (Normalization, Indexing, Query Optimization)
-- API Design (RESTful, GraphQL, Versioning)
-- Security (OWASP Top 10, Penetration Testing, Compliance)
-- DevOps (CI/CD, Docker, Kubernetes, Cloud Infrastructure)
-- Testing (TDD, BDD, Integration Testing, E2E Testing)
-- Code Quality (Clean Code, Refactoring, Code Reviews)
-
-## CRITICAL REQUIREMENTS:
-
-### 1. **THINK DEEPLY BEFORE WRITING**
-Take your time to:
-- Analyze the requirements thoroughly
-- Consider edge cases and potential issues
-- Evaluate multiple approaches
-- Choose the best technical solution
-- Plan the implementation sequence
-
-### 2. **BE EXTREMELY DETAILED**
-Every section must include:
-- ✓ **WHY** - Justify every decision
-- ✓ **WHAT** - Exact specifications
-- ✓ **HOW** - Step-by-step instructions
-- ✓ **CODE STRUCTURE** - File paths, class names, method signatures
-- ✓ **EXAMPLES** - Code snippets showing the pattern
-- ✓ **PITFALLS** - Common mistakes to avoid
-- ✓ **ALTERNATIVES** - Other approaches considered and why rejected
-
-### 3. **FOLLOW THIS COMPREHENSIVE STRUCTURE:**
-
-```markdown
-# Technical Implementation Guide
-*Enterprise Laravel Application - Complete A-Z Guide*
-
----
-
-## 📋 EXECUTIVE SUMMARY
-### Project Overview
-- Application name and purpose
-- Target audience and scale (users, requests/day, data volume)
-- Success criteria and KPIs
-- Timeline estimation (realistic, with buffer)
-- Team composition recommendation
-
-### Technology Stack Decision Matrix
-| Technology | Choice | Alternative Considered | Reason for Selection |
-|------------|--------|------------------------|----------------------|
-| Backend | Laravel 11 | Symfony, Node.js | Best for rapid development, mature ecosystem |
-| Database | MySQL 8.0 | PostgreSQL, MariaDB | [Justify based on requirements] |
-| Cache | Redis | Memcached | Better data structures, persistence |
-| Queue | Redis Queue | RabbitMQ, SQS | Simpler setup, sufficient for scale |
-| Search | Meilisearch | Elasticsearch, Algolia | Cost-effective, easy to use |
-| Storage | S3 | Local, Cloudinary | Scalability, CDN integration |
-
-### Architecture Decision Records (ADRs)
-For each major decision:
-1. **Context**: What problem are we solving?
-2. **Decision**: What did we decide?
-3. **Consequences**: What are the trade-offs?
-
----
-
-## 🏗️ PHASE 1: PROJECT FOUNDATION (Week 1)
-
-### 1.1 Development Environment Setup
-
-#### Local Development with Docker
-**File: `docker-compose.yml`**
-```yaml
-version: '3.8'
-services:
-  app:
-    build:
-      context: .
-      dockerfile: Dockerfile.dev
-    volumes:
-      - .:/var/www/html
-    ports:
-      - "8000:8000"
-    environment:
-      - APP_ENV=local
-
-  mysql:
-    image: mysql:8.0
-    environment:
-      MYSQL_ROOT_PASSWORD: secret
-      MYSQL_DATABASE: laravel_app
-    volumes:
-      - mysql_data:/var/lib/mysql
-
-  redis:
-    image: redis:alpine
-    ports:
-      - "6379:6379"
-
-volumes:
-  mysql_data:
-```
-
-**Step-by-step setup:**
-1. `git init` - Initialize repository
-2. Create `.gitignore` with Laravel defaults
-3. `docker-compose up -d` - Start containers
-4. `composer create-project laravel/laravel .` - Install Laravel
-5. Configure `.env` with database credentials
-6. `php artisan key:generate` - Generate app key
-7. Test: Visit `http://localhost:8000`
-
-#### CI/CD Pipeline Setup
-**File: `.github/workflows/main.yml`**
-[Provide complete GitHub Actions workflow]
-
-### 1.2 Initial Laravel Configuration
-
-#### Directory Structure Planning
-```
-app/
-├── Actions/          # Single-action classes (invokable)
-├── DataTransferObjects/  # DTOs for type safety
-├── Enums/           # PHP 8.1+ enums
-├── Events/
-├── Exceptions/
-├── Http/
-│   ├── Controllers/
-│   │   ├── Api/V1/   # Versioned APIs
-│   │   └── Web/
-│   ├── Middleware/
-│   ├── Requests/     # Form requests for validation
-│   └── Resources/    # API resources
-├── Jobs/
-├── Listeners/
-├── Models/
-├── Notifications/
-├── Observers/        # Model observers
-├── Policies/
-├── Providers/
-├── Repositories/     # Data access layer
-├── Services/         # Business logic layer
-└── Traits/          # Reusable traits
-```
-
-**Why this structure?**
-- Separation of concerns
-- Easy to test
-- Scalable for large teams
-- Clear responsibility boundaries
-
-#### Core Configuration Files
-**File: `config/app.php`**
-[Detail important configurations]
+    # Resolving the AI settings may call Laravel synchronously on a cache miss
+    config = await asyncio.to_thread(
+        _developer_config, user_id=user_id, ai_provider=ai_provider, ai_api_key=ai_api_key
+    )
+    provider = config['provider']
 
----
+    cached, embedding = await _lookup_solution(config, thread_id, user_id, requirements, is_republish)
+    if cached is not None:
+        return cached
+    await _check_requirements(config, requirements)
 
-## 🗄️ PHASE 2: DATABASE ARCHITECTURE (Week 1-2)
-
-### 2.1 Complete Database Schema Design
-
-#### Entity-Relationship Analysis
-[Provide complete ERD with cardinality]
-
-#### Migration Strategy
-**Order of migrations** (to avoid foreign key errors):
-1. Independent tables (no foreign keys)
-2. Lookup/reference tables
-3. Main entity tables
-4. Relationship/pivot tables
-
-#### Table-by-Table Specification
-
-**Migration 1: users table**
-**File: `database/migrations/2024_01_01_000001_create_users_table.php`**
-
-```php
-<?php
-
-use Illuminate\\Database\\Migrations\\Migration;
-use Illuminate\\Database\\Schema\\Blueprint;
-use Illuminate\\Support\\Facades\\Schema;
-
-return new class extends Migration
-{{
-    public function up(): void
-    {{
-        Schema::create('users', function (Blueprint $table) {{
-            // Primary key
-            $table->id();
-
-            // Basic info
-            $table->string('name');
-            $table->string('email')->unique();
-            $table->timestamp('email_verified_at')->nullable();
-            $table->string('password');
-
-            // Profile fields
-            $table->string('phone', 20)->nullable();
-            $table->text('bio')->nullable();
-            $table->string('avatar_url')->nullable();
-
-            // Role & permissions
-            $table->enum('role', ['admin', 'manager', 'user'])->default('user');
-            $table->boolean('is_active')->default(true);
-
-            // Security
-            $table->timestamp('last_login_at')->nullable();
-            $table->string('last_login_ip', 45)->nullable();
-            $table->integer('failed_login_attempts')->default(0);
-            $table->timestamp('locked_until')->nullable();
-
-            // Laravel defaults
-            $table->rememberToken();
-            $table->timestamps();
-            $table->softDeletes();
-
-            // Indexes
-            $table->index('email');
-            $table->index('role');
-            $table->index(['is_active', 'deleted_at']);
-            $table->index('last_login_at');
-        }});
-    }}
-
-    public function down(): void
-    {{
-        Schema::dropIfExists('users');
-    }}
-}};
-```
-
-**Design rationale:**
-- `id`: BIGINT for scalability (2^63 records)
-- `email`: Unique index for fast lookups
-- `soft_deletes`: Preserve data for audit trail
-- `last_login_ip`: VARCHAR(45) supports IPv6
-- Composite index on (is_active, deleted_at) for queries filtering active users
-- `locked_until`: Temporary account lock for brute force protection
-
-**Seeder for development:**
-**File: `database/seeders/UserSeeder.php`**
-[Provide complete seeder with fake data]
-
-[Repeat for EVERY table in the system]
-
-### 2.2 Database Optimization Strategy
-
-#### Indexing Strategy
-```sql
--- Composite index for common query patterns
-CREATE INDEX idx_users_active_role ON users(is_active, role);
-
--- Full-text search index
-ALTER TABLE posts ADD FULLTEXT KEY idx_posts_search (title, content);
-
--- Covering index (includes all columns needed for query)
-CREATE INDEX idx_orders_covering ON orders(user_id, status, created_at) INCLUDE (total_amount);
-```
-
-**When to use each index type:**
-- Single column: Simple lookups (email, uuid)
-- Composite: Multi-column WHERE clauses
-- Full-text: Search functionality
-- Unique: Enforce uniqueness (email, slug)
-- Covering: Avoid table access (index-only scan)
-
-#### Query Optimization Patterns
-[Provide N+1 prevention strategies, eager loading examples]
+    fast_llm = _developer_llm(config, "fast")
+    smart_llm = _developer_llm(config, "smart")
 
----
+    logger.info(
+        "%s technical solution for thread %s in %s sections",
+        "Republishing" if is_republish else "Generating", thread_id, len(SOLUTION_SECTIONS) + 1
+    )
 
-## 🚀 PHASE 3: CORE APPLICATION DEVELOPMENT (Week 2-4)
-
-### 3.1 Authentication & Authorization System
-
-#### Authentication Implementation
-**Package: Laravel Sanctum** (vs Passport, JWT)
-**Why Sanctum?**
-- Lightweight (no OAuth complexity)
-- Perfect for SPA and mobile apps
-- First-party Laravel support
-- Stateless API tokens
-
-**Installation steps:**
-1. `composer require laravel/sanctum`
-2. `php artisan vendor:publish --provider="Laravel\\Sanctum\\SanctumServiceProvider"`
-3. `php artisan migrate`
-4. Add `HasApiTokens` trait to User model
-5. Configure in `config/sanctum.php`
-
-**Authentication Controller:**
-**File: `app/Http/Controllers/Api/V1/Auth/AuthController.php`**
-
-```php
-<?php
-
-namespace App\\Http\\Controllers\\Api\\V1\\Auth;
-
-use App\\Http\\Controllers\\Controller;
-use App\\Http\\Requests\\Auth\\LoginRequest;
-use App\\Http\\Requests\\Auth\\RegisterRequest;
-use App\\Services\\Auth\\AuthService;
-use App\\Http\\Resources\\UserResource;
-use Illuminate\\Http\\JsonResponse;
-
-class AuthController extends Controller
-{{
-    public function __construct(
-        private readonly AuthService $authService
-    ) {{}}
-
-    /**
-     * Register a new user
-     *
-     * @param RegisterRequest $request
-     * @return JsonResponse
-     */
-    public function register(RegisterRequest $request): JsonResponse
-    {{
-        $result = $this->authService->register($request->validated());
-
-        return response()->json([
-            'success' => true,
-            'message' => 'User registered successfully. Please verify your email.',
-            'data' => [
-                'user' => new UserResource($result['user']),
-                'token' => $result['token'],
-            ]
-        ], 201);
-    }}
-
-    /**
-     * Login user
-     *
-     * @param LoginRequest $request
-     * @return JsonResponse
-     */
-    public function login(LoginRequest $request): JsonResponse
-    {{
-        $result = $this->authService->login(
-            $request->validated(),
-            $request->ip(),
-            $request->userAgent()
-        );
-
-        return response()->json([
-            'success' => true,
-            'message' => 'Logged in successfully.',
-            'data' => [
-                'user' => new UserResource($result['user']),
-                'token' => $result['token'],
-                'expires_at' => $result['expires_at'],
-            ]
-        ]);
-    }}
-
-    // ... more methods
-}}
-```
-
-**Service Layer (Business Logic):**
-**File: `app/Services/Auth/AuthService.php`**
-
-```php
-<?php
-
-namespace App\\Services\\Auth;
-
-use App\\Models\\User;
-use App\\Notifications\\WelcomeEmailNotification;
-use Illuminate\\Support\\Facades\\Hash;
-use Illuminate\\Support\\Facades\\DB;
-use Illuminate\\Validation\\ValidationException;
-
-class AuthService
-{{
-    /**
-     * Register a new user
-     *
-     * @param array $data
-     * @return array
-     */
-    public function register(array $data): array
-    {{
-        return DB::transaction(function () use ($data) {{
-            // Create user
-            $user = User::create([
-                'name' => $data['name'],
-                'email' => $data['email'],
-                'password' => Hash::make($data['password']),
-                'role' => $data['role'] ?? 'user',
-            ]);
-
-            // Send welcome email
-            $user->notify(new WelcomeEmailNotification());
-
-            // Generate API token
-            $token = $user->createToken('auth_token')->plainTextToken;
-
-            return [
-                'user' => $user,
-                'token' => $token,
-            ];
-        }});
-    }}
-
-    /**
-     * Login user with security checks
-     *
-     * @param array $credentials
-     * @param string $ip
-     * @param string $userAgent
-     * @return array
-     * @throws ValidationException
-     */
-    public function login(array $credentials, string $ip, string $userAgent): array
-    {{
-        $user = User::where('email', $credentials['email'])->first();
-
-        // Check if user exists
-        if (!$user) {{
-            throw ValidationException::withMessages([
-                'email' => ['The provided credentials are incorrect.'],
-            ]);
-        }}
-
-        // Check if account is locked (brute force protection)
-        if ($user->isLocked()) {{
-            throw ValidationException::withMessages([
-                'email' => ['Account is temporarily locked. Please try again later.'],
-            ]);
-        }}
-
-        // Verify password
-        if (!Hash::check($credentials['password'], $user->password)) {{
-            $user->incrementFailedLoginAttempts();
-
-            throw ValidationException::withMessages([
-                'email' => ['The provided credentials are incorrect.'],
-            ]);
-        }}
-
-        // Check if user is active
-        if (!$user->is_active) {{
-            throw ValidationException::withMessages([
-                'email' => ['Your account has been deactivated.'],
-            ]);
-        }}
-
-        // Update login metadata
-        $user->update([
-            'last_login_at' => now(),
-            'last_login_ip' => $ip,
-            'failed_login_attempts' => 0,
-        ]);
-
-        // Generate token
-        $token = $user->createToken('auth_token', ['*'], now()->addDays(30))->plainTextToken;
+    requirements_ttl = "1h" if thread_id in _recent_publishes else None
+    _recent_publishes[thread_id] = True
+    requirements_block = _requirements_block(provider, requirements, requirements_ttl)
 
+    def section_messages(heading, focus, notes=""):
         return [
-            'user' => $user->fresh(),
-            'token' => $token,
-            'expires_at' => now()->addDays(30)->toISOString(),
-        ];
-    }}
-}}
-```
-
-**Why this approach?**
-- Controller: Thin, only handles HTTP concerns
-- Service: Contains business logic, reusable
-- Transactions: Ensure data consistency
-- Security: Rate limiting, account locking, IP tracking
-- Testing: Easy to unit test service layer
-
-[Continue with Authorization, Policies, Gates...]
-
----
-
-## 📡 PHASE 4: API DEVELOPMENT (Week 3-4)
-
-### 4.1 RESTful API Architecture
-
-#### API Versioning Strategy
-**URL-based versioning:** `/api/v1/users`
-
-**Why URL versioning over header versioning?**
-- Easier to debug (visible in URL)
-- Browser-testable
-- Better documentation
-- Industry standard
-
-#### Complete API Endpoint Specification
-
-**Resource: Users**
-
-| Method | Endpoint | Description | Auth | Rate Limit |
-|--------|----------|-------------|------|------------|
-| GET | /api/v1/users | List all users | Yes | 60/min |
-| GET | /api/v1/users/{{id}} | Get user by ID | Yes | 100/min |
-| POST | /api/v1/users | Create user | Admin | 10/min |
-| PUT | /api/v1/users/{{id}} | Update user | Owner/Admin | 30/min |
-| DELETE | /api/v1/users/{{id}} | Delete user | Admin | 10/min |
-
-**Endpoint Implementation:**
-
-**File: `routes/api.php`**
-```php
-<?php
-
-use Illuminate\\Support\\Facades\\Route;
-use App\\Http\\Controllers\\Api\\V1\\UserController;
-
-Route::prefix('v1')->middleware(['auth:sanctum'])->group(function () {{
-    Route::apiResource('users', UserController::class);
-}});
-```
-
-**Controller:**
-**File: `app/Http/Controllers/Api/V1/UserController.php`**
-[Provide complete CRUD controller with all methods]
-
-**Form Requests (Validation):**
-**File: `app/Http/Requests/User/StoreUserRequest.php`**
-[Complete validation rules with custom messages]
-
-**API Resources (Response Transformation):**
-**File: `app/Http/Resources/UserResource.php`**
-[Complete resource with conditional fields]
-
-#### Response Standards
-
-**Success Response:**
-```json
-{{
-  "success": true,
-  "message": "User retrieved successfully",
-  "data": {{
-    "id": 1,
-    "name": "John Doe",
-    "email": "john@example.com"
-  }},
-  "meta": {{
-    "timestamp": "2024-01-01T12:00:00Z",
-    "version": "1.0.0"
-  }}
-}}
-```
-
-**Error Response:**
-```json
-{{
-  "success": false,
-  "message": "Validation failed",
-  "errors": {{
-    "email": ["The email field is required."]
-  }},
-  "meta": {{
-    "timestamp": "2024-01-01T12:00:00Z"
-  }}
-}}
-```
-
-**Implementation:**
-**File: `app/Http/Middleware/FormatJsonResponse.php`**
-[Complete middleware for consistent responses]
-
----
-
-## 🔒 PHASE 5: SECURITY IMPLEMENTATION (Week 4-5)
-
-### 5.1 Comprehensive Security Checklist
-
-#### OWASP Top 10 Mitigation
-
-**1. Injection (SQL, NoSQL, Command)**
-✓ Use Eloquent ORM (never raw queries)
-✓ Use parameter binding for raw queries
-✓ Sanitize all user input
-✓ Validate file uploads
-
-**2. Broken Authentication**
-✓ Implement rate limiting
-✓ Use strong password hashing (bcrypt)
-✓ Implement account lockout
-✓ Enable 2FA (optional)
-✓ Secure session management
-
-**3. Sensitive Data Exposure**
-✓ Encrypt sensitive fields in database
-✓ Use HTTPS everywhere
-✓ Implement proper CORS
-✓ Secure API keys in environment variables
-
-[Continue for all 10...]
-
-#### Implementation Examples
+            _SYSTEM_MESSAGES[provider],
+            _section_request(requirements_block, heading, focus, is_republish, notes),
+        ]
+
+    # Phases are drafted concurrently; on the fast tier the duplicate prompt
+    # cache writes of simultaneous calls cost little, so no warm-up call is
+    # made before fanning out.
+    responses = await asyncio.gather(
+        *(
+            fast_llm.ainvoke(section_messages(heading, focus), stop=_section_stop(heading))
+            for heading, focus in SOLUTION_SECTIONS
+        ),
+        return_exceptions=True
+    )
+    sections = list(zip(SOLUTION_SECTIONS, responses))
+    if all(isinstance(response, BaseException) for response in responses):
+        raise responses[0]
+
+    summary_heading, summary_focus = SOLUTION_SUMMARY_SECTION
+    outline = "\n".join(
+        _outline(chunk_text(response)) if not isinstance(response, BaseException) else heading
+        for (heading, _), response in sections
+    )
+    try:
+        summary = await smart_llm.ainvoke(section_messages(
+            summary_heading, summary_focus, notes=f"**Phase outline:**\n\n{outline}"
+        ), stop=_SECTION_STOP)
+    except Exception as e:
+        summary = e
+    sections.insert(0, (SOLUTION_SUMMARY_SECTION, summary))
+
+    failed = [heading for (heading, _), response in sections if isinstance(response, BaseException)]
+    documents = []
+    for (heading, _), response in sections:
+        if isinstance(response, BaseException):
+            logger.error("Section %r failed for thread %s: %s", heading, thread_id, response)
+            markdown = f"{heading}\n\n> ⚠️ This section could not be generated. Republish to try again."
+        else:
+            markdown = chunk_text(response).strip()
+        documents.append({'heading': heading, 'markdown': markdown, 'generated': heading not in failed})
+
+    result = _solution_result(
+        thread_id, f"{_model_name(fast_llm)} + {_model_name(smart_llm)}", is_republish,
+        "\n\n---\n\n".join([SOLUTION_TITLE] + [section['markdown'] for section in documents]),
+        _sum_usage(_usage_summary(r) for _, r in sections if not isinstance(r, BaseException)),
+        sections=documents
+    )
+    if SOLUTION_CACHE_TTL > 0 and not failed:
+        await asyncio.to_thread(cache_solution, user_id, provider, requirements, embedding, result)
+    return result
+
+
+async def stream_technical_solution(
+    thread_id: str,
+    requirements: str,
+    user_id: int = 2,
+    ai_provider: str = None,
+    ai_api_key: str = None,
+    is_republish: bool = False
+):
+    """
+    Same as generate_technical_solution, but yields the document as it is written.
 
-**Rate Limiting:**
-**File: `app/Http/Kernel.php`**
-```php
-protected $middlewareGroups = [
-    'api' => [
-        'throttle:api',
-        // ...
-    ],
-];
-```
+    Streams a single whole-document completion instead of parallel sections,
+    so the tokens arrive in reading order.
 
-**File: `config/cache.php` - Custom rate limits**
-[Detailed rate limiting configuration]
+    Yields ("token", text) for every streamed chunk, then ("result", dict)
+    with the same result generate_technical_solution returns.
+    """
+    # Resolving the AI settings may call Laravel synchronously on a cache miss
+    config, llm, messages = await asyncio.to_thread(
+        _prepare_generation, user_id, ai_provider, ai_api_key, requirements, is_republish
+    )
+
+    cached, embedding = await _lookup_solution(config, thread_id, user_id, requirements, is_republish)
+    if cached is not None:
+        yield "token", cached['technical_solution']
+        yield "result", cached
+        return
+    await _check_requirements(config, requirements)
+
+    logger.info("Streaming technical solution for thread %s", thread_id)
+
+    parts = []
+    final = None
+    async for chunk in llm.astream(messages):
+        final = chunk if final is None else final + chunk
+        text = chunk_text(chunk)
+        if text:
+            parts.append(text)
+            yield "token", text
+
+    result = _solution_result(thread_id, _model_name(llm), is_republish, "".join(parts), _usage_summary(final))
+    if SOLUTION_CACHE_TTL > 0:
+        await asyncio.to_thread(cache_solution, user_id, config['provider'], requirements, embedding, result)
+    yield "result", result
+
+
+def _prepare_generation(user_id, ai_provider, ai_api_key, requirements, is_republish):
+    # Get intelligent LLM
+    config = _developer_config(user_id=user_id, ai_provider=ai_provider, ai_api_key=ai_api_key)
+    llm = _developer_llm(config, "smart", DOCUMENT_MAX_TOKENS)
 
-**XSS Prevention:**
-- Blade auto-escapes: `{{ $variable }}`
-- For HTML: `{!! $trustedHtml !!}` (use sparingly)
-- Content Security Policy headers
+    # Create the prompt; the static system prompt comes first so the provider
+    # can serve it from its prompt cache on every publish/republish
+    messages = [
+        _SYSTEM_MESSAGES[config['provider']],
+        HumanMessage(content=f"""# REQUIREMENTS DOCUMENT
 
-**CSRF Protection:**
-- Laravel handles automatically for forms
-- API uses token authentication (no CSRF needed)
+{requirements}
 
 ---
 
-## ⚡ PHASE 6: PERFORMANCE OPTIMIZATION (Week 5-6)
-
-### 6.1 Database Optimization
-
-#### Query Optimization Patterns
-
-**Problem: N+1 Query**
-```php
-// BAD - N+1 queries
-$users = User::all();
-foreach ($users as $user) {{
-    echo $user->posts->count(); // Separate query for each user
-}}
-
-// GOOD - 2 queries total
-$users = User::withCount('posts')->get();
-foreach ($users as $user) {{
-    echo $user->posts_count;
-}}
-```
-
-**Problem: Loading unnecessary columns**
-```php
-// BAD - Loads all columns
-$users = User::all();
-
-// GOOD - Only needed columns
-$users = User::select('id', 'name', 'email')->get();
-```
+## YOUR TASK:
 
-**Problem: Missing indexes**
-```sql
--- Before: Full table scan
-SELECT * FROM posts WHERE user_id = 1 AND status = 'published';
+Create a COMPREHENSIVE, A-Z, step-by-step technical implementation guide following the structure provided in the system prompt.
 
--- After: Add composite index
-CREATE INDEX idx_posts_user_status ON posts(user_id, status);
-```
+**Remember:**
+- Think deeply before writing each section
+- Be extremely detailed (minimum 50 pages)
+- Provide complete code examples
+- Justify every technical decision
+- Address security, performance, and scalability
+- Include testing and deployment strategies
+- Make it actionable - developers should build the entire app from this doc alone
 
-### 6.2 Caching Strategy
+{"**NOTE:** This is a REPUBLISH request. Review and improve the previous solution if possible." if is_republish else ""}
 
-[Complete caching implementation]
+Begin your comprehensive technical implementation guide now:""")
+    ]
+    return config, llm, messages
+
+
+async def _check_requirements(config, requirements):
+    """Raise ValueError for requirements not worth a full generation run."""
+    if _word_count(requirements) < MIN_REQUIREMENTS_WORDS:
+        raise ValueError(_VAGUE_REQUIREMENTS_ERROR)
+
+    llm = create_llm(
+        config,
+        model=FAST_DEVELOPER_MODELS.get(config['provider']),
+        temperature=0,
+        max_tokens=5
+    )
+    try:
+        verdict = await llm.ainvoke([
+            _REQUIREMENTS_CHECK_PROMPT,
+            HumanMessage(content=requirements[:_REQUIREMENTS_CHECK_CHARS]),
+        ])
+    except Exception as e:
+        # The check only saves cost; never fail a publish because of it
+        logger.warning("Requirements check failed, generating anyway: %s", e)
+        return
+    if chunk_text(verdict).strip().lower().startswith("no"):
+        raise ValueError(_VAGUE_REQUIREMENTS_ERROR)
+
+
+async def _lookup_solution(config, thread_id, user_id, requirements, is_republish):
+    """
+    Return (cached result or None, requirements embedding). A republish always
+    regenerates, but still embeds the requirements so the new result is cached.
+    """
+    if SOLUTION_CACHE_TTL <= 0:
+        return None, None
+    embedding = await asyncio.to_thread(embed_requirements, config, requirements)
+    if is_republish:
+        return None, embedding
 
----
+    cached = await asyncio.to_thread(
+        find_cached_solution, user_id, config['provider'], requirements, embedding
+    )
+    if cached is None:
+        return None, embedding
 
-## 🧪 PHASE 7: TESTING (Week 6-7)
+    logger.info("Serving cached technical solution for thread %s", thread_id)
+    return {**cached, 'thread_id': thread_id, 'is_republish': False, 'cached': True}, embedding
 
-### 7.1 Testing Strategy
 
-#### Test Pyramid
-```
-      /\\
-     /E2E\\         ← 10% (Few, slow, expensive)
-    /------\\
-   /Feature\\       ← 30% (Medium coverage)
-  /----------\\
- /Unit Tests \\     ← 60% (Many, fast, cheap)
-/──────────────\\
-```
+# Per-section user prompt. The requirements block comes first and is the
+# same content block object for every section of a publish, so it is built
+# once and stays part of the cached prefix; only the task block differs.
+_REQUIREMENTS_TEMPLATE = """# REQUIREMENTS DOCUMENT
 
-[Provide complete testing examples]
+{requirements}
 
 ---
+"""
 
-## 🚀 PHASE 8: DEPLOYMENT (Week 7-8)
+_SECTION_TASK_TEMPLATE = """## YOUR TASK:
 
-### 8.1 Production Checklist
-[Complete deployment guide]
+Write ONLY the following section of the technical implementation guide, following the structure and guidelines in the system prompt. The other sections are written separately, so do not repeat them or add a document title.
 
----
+Start with this exact heading: {heading}
 
-## 📊 MONITORING & MAINTENANCE
+**Section focus:** {focus}
 
-### Monitoring Setup
-[Telescope, Sentry, New Relic setup]
+{notes}
 
----
+**Remember:**
+- Think deeply before writing
+- Be exhaustive - this section must stand on its own
+- Provide complete code examples
+- Justify every technical decision
 
-## 📚 APPENDICES
+{republish_note}
 
-### A. Code Standards
-### B. Git Workflow
-### C. Troubleshooting Guide
-### D. Performance Benchmarks
-### E. Security Audit Checklist
-```
+Begin the section now:"""
 
-**GUIDELINES FOR EVERY SECTION:**
+_REPUBLISH_NOTE = "**NOTE:** This is a REPUBLISH request. Review and improve the previous solution if possible."
 
-1. **Be Exhaustive**: Don't summarize. Provide complete code.
-2. **Explain WHY**: Every decision must be justified
-3. **Show Alternatives**: "We considered X, Y, Z. Chose Y because..."
-4. **Include Pitfalls**: "Common mistake: doing X. Instead do Y."
-5. **Provide Examples**: Real code, not pseudocode
-6. **Think About Scale**: How does this handle 1M users?
-7. **Security First**: Address security in every phase
-8. **Maintainability**: Code must be maintainable by other developers
-9. **Testing**: Every feature must have testing strategy
-10. **Documentation**: Inline comments for complex logic
 
-**LENGTH REQUIREMENT:**
-Minimum 50 pages (20,000+ words) of dense technical documentation.
+def _requirements_block(provider, requirements, cache_ttl=None):
+    block = {"type": "text", "text": _REQUIREMENTS_TEMPLATE.format(requirements=requirements)}
+    if provider == 'Anthropic':
+        block["cache_control"] = anthropic_cache_control(cache_ttl)
+    return block
 
-Remember: A developer team should be able to build this entire application following ONLY this document, without asking additional questions."""
 
-    # Create the prompt
-    messages = [
-        SystemMessage(content=system_prompt),
-        HumanMessage(content=f"""# REQUIREMENTS DOCUMENT
+def _section_request(requirements_block, heading, focus, is_republish, notes=""):
+    task = _SECTION_TASK_TEMPLATE.format(
+        heading=heading,
+        focus=focus,
+        notes=notes,
+        republish_note=_REPUBLISH_NOTE if is_republish else "",
+    )
+    return HumanMessage(content=[requirements_block, {"type": "text", "text": task}])
 
-{requirements}
 
----
+def _outline(text):
+    """Markdown headings of a drafted section."""
+    return "\n".join(line for line in text.splitlines() if line.startswith("#"))
 
-## YOUR TASK:
 
-Create a COMPREHENSIVE, A-Z, step-by-step technical implementation guide following the structure provided in the system prompt.
+def _model_name(llm):
+    return getattr(llm, 'model_name', None) or getattr(llm, 'model', None) or 'unknown'
 
-**Remember:**
-- Think deeply before writing each section
-- Be extremely detailed (minimum 50 pages)
-- Provide complete code examples
-- Justify every technical decision
-- Address security, performance, and scalability
-- Include testing and deployment strategies
-- Make it actionable - developers should build the entire app from this doc alone
-
-{"**NOTE:** This is a REPUBLISH request. Review and improve the previous solution if possible." if is_republish else ""}
 
-Begin your comprehensive technical implementation guide now:""")
-    ]
+_WORD = re.compile(r'\S+')
 
-    print(f"🚀 {'Republishing' if is_republish else 'Generating'} technical solution for thread {thread_id}...")
-    print("🤔 Using intelligent model for deep analysis...")
 
-    # Invoke the LLM
-    response = llm.invoke(messages)
+def _word_count(text):
+    # Counts matches one at a time instead of building a list of every word
+    return sum(1 for _ in _WORD.finditer(text))
 
-    technical_solution = response.content
 
-    print(f"✅ Generated {len(technical_solution)} characters of technical documentation")
+def _solution_result(thread_id, model_used, is_republish, technical_solution, usage, sections=None):
+    char_count = len(technical_solution)
+    logger.info("Generated %s characters of technical documentation", char_count)
+    logger.info(
+        "Prompt cache for thread %s: %s tokens read, %s tokens written",
+        thread_id, usage['cache_read_input_tokens'], usage['cache_creation_input_tokens']
+    )
 
     return {
         'success': True,
         'technical_solution': technical_solution,
         'thread_id': thread_id,
-        'model_used': llm.model_name if hasattr(llm, 'model_name') else 'unknown',
+        'model_used': model_used,
         'is_republish': is_republish,
-        'word_count': len(technical_solution.split()),
-        'char_count': len(technical_solution)
+        'word_count': _word_count(technical_solution),
+        'char_count': char_count,
+        'usage': usage,
+        # [{'heading', 'markdown', 'generated'}] in document order, when the
+        # guide was generated section by section
+        'sections': sections
+    }
+
+
+def _sum_usage(usages):
+    """Combine the usage summaries of several responses."""
+    total = {}
+    for usage in usages:
+        for key, value in usage.items():
+            total[key] = (total.get(key) or 0) + (value or 0)
+    return total or _usage_summary(None)
+
+
+def _usage_summary(response):
+    """Token usage of a model response, including prompt cache reads and writes."""
+    usage = getattr(response, 'usage_metadata', None) or {}
+    details = usage.get('input_token_details') or {}
+    return {
+        'input_tokens': usage.get('input_tokens'),
+        'output_tokens': usage.get('output_tokens'),
+        'cache_read_input_tokens': details.get('cache_read', 0),
+        'cache_creation_input_tokens': details.get('cache_creation', 0),
     }
@@ -0,0 +1,123 @@
+"""
+Semantic cache for generated technical solutions.
+
+Publishing the same (or nearly the same) requirements again returns the
+previously generated guide from Redis instead of another multi-call LLM run.
+Requirements are matched exactly by hash, and otherwise by cosine similarity
+of their OpenAI embeddings (text-embedding-3-small) above
+SOLUTION_CACHE_SIMILARITY. Entries are kept per user and provider, newest
+first. Disabled unless SOLUTION_CACHE_TTL is set (seconds).
+"""
+from cachetools import LRUCache
+from app.redis_client import get_redis_client
+import hashlib
+import math
+import orjson
+import os
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+SOLUTION_CACHE_TTL = int(os.getenv("SOLUTION_CACHE_TTL", "0"))
+SOLUTION_CACHE_SIMILARITY = float(os.getenv("SOLUTION_CACHE_SIMILARITY", "0.95"))
+SOLUTION_CACHE_MAX_ENTRIES = int(os.getenv("SOLUTION_CACHE_MAX_ENTRIES", "50"))
+EMBEDDING_MODEL = "text-embedding-3-small"
+_KEY_PREFIX = "solution_cache:"
+
+
+def _cache_key(user_id, provider):
+    return f"{_KEY_PREFIX}{user_id}:{provider}"
+
+
+def _requirements_hash(requirements):
+    return hashlib.sha256(requirements.strip().encode()).hexdigest()
+
+
+# Embeddings clients by sha256 of the API key, so plain keys are not cache keys
+_embeddings_clients = LRUCache(maxsize=16)
+_embeddings_clients_lock = threading.Lock()
+
+
+def _get_embeddings(api_key):
+    from langchain_openai import OpenAIEmbeddings
+    from app.agents._http import SHARED_ASYNC_HTTPX, SHARED_HTTPX
+    key = hashlib.sha256(api_key.encode()).hexdigest()
+    with _embeddings_clients_lock:
+        embeddings = _embeddings_clients.get(key)
+        if embeddings is None:
+            embeddings = OpenAIEmbeddings(
+                model=EMBEDDING_MODEL,
+                api_key=api_key,
+                http_client=SHARED_HTTPX,
+                http_async_client=SHARED_ASYNC_HTTPX
+            )
+            _embeddings_clients[key] = embeddings
+    return embeddings
+
+
+def embed_requirements(config, requirements):
+    """
+    Embedding of the requirements, or None when no OpenAI key is available
+    (Anthropic users without OPENAI_API_KEY fall back to exact matches).
+    """
+    api_key = config['api_key'] if config['provider'] == 'OpenAI' else os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        return None
+    try:
+        return _get_embeddings(api_key).embed_query(requirements)
+    except Exception as e:
+        logger.warning("Requirements embedding failed: %s", e)
+        return None
+
+
+def _cosine(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+def find_cached_solution(user_id, provider, requirements, embedding):
+    """Return the cached solution result for matching requirements, or None."""
+    if SOLUTION_CACHE_TTL <= 0:
+        return None
+    try:
+        entries = get_redis_client().lrange(_cache_key(user_id, provider), 0, -1)
+    except Exception as e:
+        logger.warning("Solution cache lookup failed: %s", e)
+        return None
+
+    requirements_hash = _requirements_hash(requirements)
+    best, best_similarity = None, SOLUTION_CACHE_SIMILARITY
+    for raw in entries:
+        entry = orjson.loads(raw)
+        if entry['requirements_hash'] == requirements_hash:
+            return entry['result']
+        if embedding is not None and entry.get('embedding') is not None:
+            similarity = _cosine(embedding, entry['embedding'])
+            if similarity >= best_similarity:
+                best, best_similarity = entry['result'], similarity
+
+    if best is not None:
+        logger.info("Solution cache hit for user %s (similarity %.3f)", user_id, best_similarity)
+    return best
+
+
+def cache_solution(user_id, provider, requirements, embedding, result):
+    """Store a generated solution result for these requirements."""
+    if SOLUTION_CACHE_TTL <= 0 or not result.get('technical_solution'):
+        return
+    key = _cache_key(user_id, provider)
+    entry = orjson.dumps({
+        'requirements_hash': _requirements_hash(requirements),
+        'embedding': embedding,
+        'result': result,
+    })
+    try:
+        pipe = get_redis_client().pipeline()
+        pipe.lpush(key, entry)
+        pipe.ltrim(key, 0, SOLUTION_CACHE_MAX_ENTRIES - 1)
+        pipe.expire(key, SOLUTION_CACHE_TTL)
+        pipe.execute()
+    except Exception as e:
+        logger.warning("Solution cache store failed: %s", e)
@@ -1,16 +1,39 @@
-from langchain.tools import tool
-from app.database import save_requirements_to_laravel, save_solution_to_laravel, update_solution_requirements, update_solution_technical
-import requests
-import os
+from langchain_core.tools import tool
+from pydantic import BaseModel, Field
+from typing import Optional
+from cachetools import TTLCache
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
 
 # Simple in-memory storage for the session (fallback)
-# Primary storage is in Laravel MySQL database
+# Primary storage is in Laravel MySQL database. Only the latest document per
+# thread is kept, only for the most recently used threads, and only for an
+# hour after it was last saved, so a long-running process does not
+# accumulate every document ever saved.
+SESSION_MEMORY_MAXSIZE = 256
+SESSION_MEMORY_TTL = 3600
+
 session_memory = {
-    "requirements": [],
-    "solutions": []
+    "requirements": TTLCache(maxsize=SESSION_MEMORY_MAXSIZE, ttl=SESSION_MEMORY_TTL),
+    "solutions": TTLCache(maxsize=SESSION_MEMORY_MAXSIZE, ttl=SESSION_MEMORY_TTL)
 }
+_session_memory_lock = threading.Lock()
+
+def _remember(kind, thread_id, document):
+    with _session_memory_lock:
+        session_memory[kind][thread_id] = document
+
+class SaveRequirementsInput(BaseModel):
+    requirements: str = Field(min_length=1, description="The complete requirements document in markdown format")
+    thread_id: Optional[str] = Field(default=None, description="The conversation thread ID")
+
+class SaveSolutionInput(BaseModel):
+    solution: str = Field(min_length=1, description="The complete technical solution document in markdown format")
+    thread_id: Optional[str] = Field(default=None, description="The conversation thread ID")
 
-@tool
+@tool(args_schema=SaveRequirementsInput)
 def save_requirements(requirements: str, thread_id: str = None):
     """
     Saves the gathered requirements to Laravel database in markdown format.
@@ -21,18 +44,18 @@ def save_requirements(requirements: str, thread_id: str = None):
         thread_id: The conversation thread ID
     """
     # Save to in-memory (fallback)
-    session_memory["requirements"].append(requirements)
+    _remember("requirements", thread_id, requirements)
 
     # Note: Database persistence is handled by main.py after graph completion
     # to avoid deadlock with single-threaded Laravel server
 
     if thread_id:
-        print(f"Requirements marked for saving (thread: {thread_id}, length: {len(requirements)} chars)")
+        logger.info("Requirements marked for saving (thread: %s, length: %s chars)", thread_id, len(requirements))
         return "Requirements saved successfully to the database. The developer agent will now propose a technical solution based on these requirements."
     else:
         return "Requirements saved to session memory only (no thread_id provided)."
 
-@tool
+@tool(args_schema=SaveSolutionInput)
 def save_solution(solution: str, thread_id: str = None):
     """
     Saves the proposed technical solution to Laravel database in markdown format.
@@ -42,16 +65,21 @@ def save_solution(solution: str, thread_id: str = None):
         thread_id: The conversation thread ID
     """
     # Save to in-memory (fallback)
-    session_memory["solutions"].append(solution)
+    _remember("solutions", thread_id, solution)
 
     # Note: Database persistence is handled by main.py after graph completion
     # to avoid deadlock with single-threaded Laravel server
 
     if thread_id:
-        print(f"Solution marked for saving (thread: {thread_id}, length: {len(solution)} chars)")
+        logger.info("Solution marked for saving (thread: %s, length: %s chars)", thread_id, len(solution))
         return "Solution saved successfully to the database. The conversation is now complete."
     else:
         return "Solution saved to session memory only (no thread_id provided)."
 
-def get_memory():
-    return session_memory
+def get_memory(thread_id: str = None):
+    """Latest requirements and solution saved to session memory for a thread."""
+    with _session_memory_lock:
+        return {
+            "requirements": session_memory["requirements"].get(thread_id),
+            "solutions": session_memory["solutions"].get(thread_id)
+        }
@@ -1,17 +1,173 @@
 from langchain_community.vectorstores import Redis
 from langchain_openai import OpenAIEmbeddings
-from langchain.tools import tool
+from langchain_core.tools import tool
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableConfig
+from pydantic import BaseModel, Field
+from app.redis_client import get_redis_client
+from collections import deque
+from functools import lru_cache
+from typing import List
+import hashlib
+import logging
+import math
+import operator
 import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
 
 # Initialize Embeddings
 # Note: We might need to make this dynamic based on the provider, but for now assuming OpenAI embeddings are fine or we can switch to HuggingFace if needed.
 # Since the user has OpenAI/Anthropic keys, we'll try to use OpenAI embeddings if available, or fallback.
 # For simplicity in this step, I'll assume OpenAI embeddings.
 
+# Optional LLM relevance grading of retrieved chunks. When enabled, the search
+# over-fetches candidates and keeps the top results the grader marks relevant.
+KB_GRADE_RESULTS = os.getenv("KB_GRADE_RESULTS", "false").lower() == "true"
+GRADE_CANDIDATES = 10
+GRADE_BATCH_SIZE = 25
+SEARCH_RESULTS = 3
+
+# Search results are cached in Redis per agent type and normalized query, so
+# a repeated question skips the query embedding and the vector search. Set
+# KB_SEARCH_CACHE_TTL=0 to disable (e.g. while curating the knowledge base).
+KB_SEARCH_CACHE_TTL = int(os.getenv("KB_SEARCH_CACHE_TTL", "3600"))
+_SEARCH_CACHE_PREFIX = "kb_search:"
+
+def _search_cache_key(agent_type, query):
+    normalized = " ".join(query.lower().split())
+    digest = hashlib.sha256(f"{agent_type}\0{KB_GRADE_RESULTS}\0{normalized}".encode()).hexdigest()
+    return _SEARCH_CACHE_PREFIX + digest
+
+# Semantic layer behind the exact cache: reworded follow-up questions within
+# a conversation usually retrieve the same chunks, so a query whose embedding
+# is within KB_SEMANTIC_CACHE_SIMILARITY (cosine) of a recent one reuses its
+# result. Kept in process memory: reading every candidate embedding from
+# Redis on each search would cost more than the search it replaces.
+KB_SEMANTIC_CACHE_SIMILARITY = float(os.getenv("KB_SEMANTIC_CACHE_SIMILARITY", "0.95"))
+KB_SEMANTIC_CACHE_SIZE = 256
+_semantic_cache = {}
+_semantic_cache_lock = threading.Lock()
+
+def _unit(vector):
+    norm = math.sqrt(math.fsum(x * x for x in vector))
+    return [x / norm for x in vector] if norm else list(vector)
+
+def _find_similar_search(agent_type, unit_embedding):
+    now = time.monotonic()
+    with _semantic_cache_lock:
+        entries = list(_semantic_cache.get(agent_type, ()))
+    best, best_similarity = None, KB_SEMANTIC_CACHE_SIMILARITY
+    for embedding, result, expires_at in entries:
+        if expires_at < now:
+            continue
+        similarity = math.fsum(map(operator.mul, unit_embedding, embedding))
+        if similarity >= best_similarity:
+            best, best_similarity = result, similarity
+    return best
+
+def _remember_search(agent_type, unit_embedding, result):
+    with _semantic_cache_lock:
+        entries = _semantic_cache.setdefault(agent_type, deque(maxlen=KB_SEMANTIC_CACHE_SIZE))
+        entries.append((unit_embedding, result, time.monotonic() + KB_SEARCH_CACHE_TTL))
+
+class ChunkScore(BaseModel):
+    index: int = Field(description="Index of the chunk within the batch")
+    relevant: bool = Field(description="Whether the chunk helps answer the query")
+
+class ChunkGrades(BaseModel):
+    scores: List[ChunkScore]
+
+def _grading_messages(query, chunks):
+    numbered = "\n\n".join(f"[{i}]\n{chunk}" for i, chunk in enumerate(chunks))
+    return [
+        SystemMessage(content=(
+            "You grade knowledge base excerpts for relevance to a search query. "
+            "Return a score for every excerpt index."
+        )),
+        HumanMessage(content=f"Query: {query}\n\nExcerpts:\n\n{numbered}"),
+    ]
+
+def batch_grade_chunks(llm, chunks, query, batch_size=GRADE_BATCH_SIZE):
+    """
+    Grade retrieved chunks for relevance to the query.
+
+    Issues one structured-output call per batch of chunks (N chunks cost
+    ceil(N / batch_size) calls) and runs the batches concurrently.
+
+    Returns:
+        Relevant chunks in their original order. A batch whose grading call
+        fails is kept ungraded rather than dropped.
+    """
+    if not chunks:
+        return []
+
+    grader = llm.with_structured_output(ChunkGrades)
+    batches = [chunks[i:i + batch_size] for i in range(0, len(chunks), batch_size)]
+    results = grader.batch(
+        [_grading_messages(query, batch) for batch in batches],
+        return_exceptions=True
+    )
+
+    relevant = []
+    for batch, result in zip(batches, results):
+        if isinstance(result, Exception):
+            relevant.extend(batch)
+            continue
+        keep = {score.index for score in result.scores if score.relevant}
+        relevant.extend(chunk for i, chunk in enumerate(batch) if i in keep)
+    return relevant
+
+def _grade_results(chunks, query, config):
+    from app.agents.requirement_agent import FAST_MODELS, create_llm, resolve_llm_config
+
+    configurable = (config or {}).get("configurable", {})
+    llm_config = resolve_llm_config(
+        user_id=configurable.get("user_id", 2),
+        ai_provider=configurable.get("ai_provider"),
+        ai_api_key=configurable.get("ai_api_key")
+    )
+    llm = create_llm(llm_config, model=FAST_MODELS.get(llm_config['provider']))
+    return batch_grade_chunks(llm, chunks, query)
+
+# Must match how kb-admin builds the kb_* indexes (redis_client.create_vector_index)
+# and embeds their chunks; without an explicit schema the vector store assumes
+# its own default layout (a FLAT "content_vector" field) and misses the HNSW
+# "embedding" field kb-admin writes.
+KB_EMBEDDING_MODEL = "text-embedding-3-small"
+KB_INDEX_SCHEMA = {
+    "text": [{"name": "content"}, {"name": "title"}],
+    "numeric": [{"name": "document_id"}, {"name": "kb_id"}, {"name": "chunk_index"}],
+    "vector": [{
+        "name": "embedding",
+        "algorithm": "HNSW",
+        "dims": 1536,
+        "distance_metric": "COSINE",
+        "datatype": "FLOAT32",
+    }],
+}
+
+@lru_cache(maxsize=1)
+def _get_embeddings():
+    # One embeddings client for every index, on the process-wide keep-alive
+    # HTTP pools; built on first use so importing this module needs no key
+    from app.agents._http import SHARED_ASYNC_HTTPX, SHARED_HTTPX
+    return OpenAIEmbeddings( # Requires OPENAI_API_KEY to be set in env or passed
+        model=KB_EMBEDDING_MODEL,
+        http_client=SHARED_HTTPX,
+        http_async_client=SHARED_ASYNC_HTTPX
+    )
+
+@lru_cache(maxsize=16)
 def get_vector_store(agent_type: str = "default"):
     """
     Get vector store with agent-specific index.
 
+    Built once per agent type and reused by every search, so each call does
+    not create a new embeddings client and Redis connection.
+
     Args:
         agent_type: Agent type (requirement_agent, developer_agent, generic)
                    Defaults to "default" for backward compatibility
@@ -20,7 +176,7 @@ def get_vector_store(agent_type: str = "default"):
         Redis vector store instance
     """
     redis_url = os.getenv("REDIS_URL", "redis://redis:6379")
-    embeddings = OpenAIEmbeddings() # Requires OPENAI_API_KEY to be set in env or passed
+    embeddings = _get_embeddings()
 
     # Dynamic index name based on agent type
     # Pattern: kb_{agent_type} (e.g., kb_requirement_agent, kb_developer_agent)
@@ -34,11 +190,12 @@ def get_vector_store(agent_type: str = "default"):
         redis_url=redis_url,
         embedding=embeddings,
         index_name=index_name,
+        index_schema=KB_INDEX_SCHEMA,
     )
     return vector_store
 
 @tool
-def search_knowledge_base(query: str, agent_type: str = "default"):
+def search_knowledge_base(query: str, agent_type: str = "default", config: RunnableConfig = None):
     """
     Searches the agent-specific knowledge base for relevant information.
 
@@ -49,9 +206,39 @@ def search_knowledge_base(query: str, agent_type: str = "default"):
     Returns:
         Relevant knowledge base content or error message
     """
+    # Results go back to the model as a ToolMessage, never spliced into the
+    # system prompt, so the provider-side prompt prefix cache stays valid.
+    cache_key = _search_cache_key(agent_type, query)
+    if KB_SEARCH_CACHE_TTL > 0:
+        try:
+            cached = get_redis_client().get(cache_key)
+            if cached is not None:
+                return cached
+        except Exception as e:
+            logger.warning("Knowledge base cache lookup failed: %s", e)
+
+    cache_scope = (agent_type, KB_GRADE_RESULTS)
     try:
+        # Embedded once: the same vector serves the semantic cache and the search
+        embedding = _unit(_get_embeddings().embed_query(query))
+        if KB_SEARCH_CACHE_TTL > 0:
+            cached = _find_similar_search(cache_scope, embedding)
+            if cached is not None:
+                return cached
+
         vector_store = get_vector_store(agent_type)
-        results = vector_store.similarity_search(query, k=3)
-        return "\n\n".join([doc.page_content for doc in results])
+        k = GRADE_CANDIDATES if KB_GRADE_RESULTS else SEARCH_RESULTS
+        chunks = [doc.page_content for doc in vector_store.similarity_search_by_vector(embedding, k=k)]
+        if KB_GRADE_RESULTS:
+            chunks = _grade_results(chunks, query, config)[:SEARCH_RESULTS]
+        result = "\n\n".join(chunks)
     except Exception as e:
         return f"Error searching knowledge base: {e}"
+
+    if KB_SEARCH_CACHE_TTL > 0 and result:
+        _remember_search(cache_scope, embedding, result)
+        try:
+            get_redis_client().setex(cache_key, KB_SEARCH_CACHE_TTL, result)
+        except Exception as e:
+            logger.warning("Knowledge base cache store failed: %s", e)
+    return result
@@ -1,17 +1,133 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from fastapi.routing import APIRoute
+from starlette.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel
+from typing import List, Optional
+from app.logging_config import configure_logging
 from app.graph import app_graph
-from app.database import save_conversation_metadata, create_solution
+from app.agents._http import aclose_shared_clients
+from app.agents.requirement_agent import chunk_text
+from app.agents.warmup import warmup_agents
+from app.database import (
+    create_solution_async,
+    invalidate_llm_config,
+    save_conversation_metadata_async,
+    save_solution_to_laravel_async,
+    start_settings_invalidation_listener,
+)
+from app.http import aclose_laravel_client
+from app.redis_client import get_redis_client
+from app.conversation_writer import conversation_writer
+from app.background import BackgroundQueue
+from app.services.developer_service import generate_technical_solution, stream_technical_solution
 from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from cachetools import LRUCache
+import asyncio
+import logging
+import orjson
+import threading
 import uuid
 import os
 import httpx
 
-app = FastAPI()
+configure_logging()
+
+logger = logging.getLogger(__name__)
+
+# Graph runs (asyncio.to_thread) hold a worker thread for the whole LLM round
+# trip. asyncio's default pool has only min(32, cpu + 4) threads, which would
+# cap concurrent /ask requests far below what the event loop can serve.
+GRAPH_THREAD_POOL_SIZE = int(os.getenv("GRAPH_THREAD_POOL_SIZE", "64"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start warmup on startup; flush pending writes and close shared clients on shutdown."""
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=GRAPH_THREAD_POOL_SIZE, thread_name_prefix="graph")
+    )
+    # Receives AI settings invalidations broadcast by other workers
+    settings_listener = await asyncio.to_thread(start_settings_invalidation_listener)
+    # Runs in the background so requests are served while agents warm up
+    warmup_task = asyncio.create_task(warmup_agents())
+
+    yield
+
+    warmup_task.cancel()
+    try:
+        await warmup_task
+    except asyncio.CancelledError:
+        pass
+    if settings_listener is not None:
+        settings_listener.stop()
+    await qa_capture_queue.aclose()
+    await conversation_setup_queue.aclose()
+    await conversation_writer.aclose()
+    await aclose_shared_clients()
+    await aclose_laravel_client()
+    await KB_ADMIN_CLIENT.aclose()
+
+class _ORJSONRequest(Request):
+    """Request whose JSON body is parsed by orjson instead of the stdlib decoder."""
+
+    async def json(self):
+        if not hasattr(self, "_json"):
+            # orjson.JSONDecodeError subclasses json.JSONDecodeError, so
+            # malformed bodies still get FastAPI's usual 422 response
+            self._json = orjson.loads(await self.body())
+        return self._json
+
+
+class _ORJSONRoute(APIRoute):
+    """Route that hands its handler an _ORJSONRequest."""
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request):
+            return await handler(_ORJSONRequest(request.scope, request.receive))
+
+        return route_handler
+
+
+# Requests and responses carry whole requirements/solution documents; orjson
+# parses and serializes them several times faster than the stdlib json module
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+app.router.route_class = _ORJSONRoute
+
+
+class _GZipExceptStreams(GZipMiddleware):
+    """GZipMiddleware that leaves the SSE endpoints alone, so events are not held in the compressor."""
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].endswith("/stream"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+# /ask and /publish return whole requirements/solution documents; compress
+# them for clients that accept gzip (Laravel requests it explicitly)
+app.add_middleware(_GZipExceptStreams, minimum_size=1024, compresslevel=1)
 
 # KB-Admin service URL for self-learning
 KB_ADMIN_URL = os.getenv("KB_ADMIN_URL", "http://kb-admin:8000")
 
+# Keep-alive client for Q&A capture; one per process instead of one per answer
+KB_ADMIN_CLIENT = httpx.AsyncClient(
+    base_url=KB_ADMIN_URL,
+    timeout=5.0,
+    limits=httpx.Limits(max_connections=10, max_keepalive_connections=5)
+)
+
+# Q&A captures are sent one at a time off the request path
+qa_capture_queue = BackgroundQueue("Q&A capture")
+# New conversations' records (and their first Q&A capture) are created off
+# the request path as well; a failed setup is retried with backoff
+conversation_setup_queue = BackgroundQueue("conversation setup", max_retries=3, retry_delay=2)
+
 class Question(BaseModel):
     question: str
     thread_id: str = None
@@ -20,6 +136,9 @@ class Question(BaseModel):
     ai_provider: str = None  # OpenAI or Anthropic
     ai_api_key: str = None  # API key passed from Laravel
 
+class BatchQuestion(BaseModel):
+    items: List[Question]
+
 
 async def capture_qa_pair(
     question: str,
@@ -36,51 +155,46 @@ async def capture_qa_pair(
     If capture fails, it logs the error but doesn't affect the conversation.
     """
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            payload = {
-                "agent_type": agent_type,
-                "knowledge_type": "qa_pair",
-                "source_thread_id": thread_id,
-                "source_conversation_id": conversation_id,
-                "question": question,
-                "answer": answer,
-                "context": {
-                    "captured_from": "idea_agent",
-                    "agent_type": agent_type
-                },
-                "confidence_score": confidence_score
-            }
+        payload = {
+            "agent_type": agent_type,
+            "knowledge_type": "qa_pair",
+            "source_thread_id": thread_id,
+            "source_conversation_id": conversation_id or conversation_writer.conversation_id(thread_id),
+            "question": question,
+            "answer": answer,
+            "context": {
+                "captured_from": "idea_agent",
+                "agent_type": agent_type
+            },
+            "confidence_score": confidence_score
+        }
 
-            response = await client.post(
-                f"{KB_ADMIN_URL}/api/learning/capture",
-                json=payload
-            )
+        response = await KB_ADMIN_CLIENT.post(
+            "/api/learning/capture",
+            json=payload
+        )
 
-            if response.status_code == 201:
-                print(f"✅ Q&A pair captured for review (thread: {thread_id})")
-            else:
-                print(f"⚠️ Failed to capture Q&A: {response.status_code}")
+        if response.status_code == 201:
+            logger.debug("Q&A pair captured for review (thread: %s)", thread_id)
+        else:
+            logger.warning("Failed to capture Q&A: %s", response.status_code)
 
     except Exception as e:
         # Log but don't fail - self-learning is optional
-        print(f"⚠️ Error capturing Q&A pair: {e}")
+        logger.warning("Error capturing Q&A pair: %s", e)
 
 @app.get("/")
 def read_root():
     return {"message": "Hello from Multi-Agent System!"}
 
-@app.post("/ask")
-async def ask_question(q: Question):
-    """
-    Process a question through the multi-agent system.
-    Conversation state is preserved using the thread_id.
-    Messages are stored in Redis, metadata in MySQL.
-    """
-    # Generate or use existing thread_id for conversation continuity
-    thread_id = q.thread_id or str(uuid.uuid4())
-    is_new_conversation = q.thread_id is None
+# The message history is checkpointed as a whole, so every persisted step
+# re-serializes the full, growing conversation. "exit" writes one checkpoint
+# per run instead of one per graph step (agent, tools, agent, ...); a run that
+# fails midway leaves the thread at its previous checkpoint.
+CHECKPOINT_DURABILITY = os.getenv("CHECKPOINT_DURABILITY", "exit")
 
-    config = {
+def _ask_config(q: Question, thread_id: str):
+    return {
         "configurable": {
             "thread_id": thread_id,
             "user_id": q.user_id,
@@ -89,6 +203,28 @@ async def ask_question(q: Question):
         }
     }
 
+# Threads whose last graph run failed. Only those can hold dangling tool calls
+# (a clean run always answers its own), so only those are checked on the next
+# turn instead of loading and scanning the checkpoint on every /ask.
+_HEAL_KEY_PREFIX = "heal:"
+HEAL_FLAG_TTL = 7 * 24 * 3600
+
+def _mark_needs_heal(thread_id):
+    try:
+        get_redis_client().set(_HEAL_KEY_PREFIX + thread_id, 1, ex=HEAL_FLAG_TTL)
+    except Exception as e:
+        logger.warning("Could not flag thread %s for healing: %s", thread_id, e)
+
+def _heal_if_needed(config, thread_id):
+    try:
+        needs_heal = get_redis_client().delete(_HEAL_KEY_PREFIX + thread_id)
+    except Exception as e:
+        logger.warning("Could not read heal flag of thread %s: %s", thread_id, e)
+        needs_heal = True
+    if needs_heal:
+        _heal_dangling_tool_calls(config, thread_id)
+
+def _heal_dangling_tool_calls(config, thread_id):
     # Self-healing: Check for dangling tool calls in the state
     # This fixes "BadRequestError: An assistant message with 'tool_calls' must be followed by tool messages"
     try:
@@ -115,7 +251,7 @@ async def ask_question(q: Question):
                     missing_ids = tool_call_ids - responded_ids
 
                     if missing_ids:
-                        print(f"Found {len(missing_ids)} dangling tool calls in thread {thread_id}. Injecting ToolMessages to fix state.")
+                        logger.warning("Found %s dangling tool calls in thread %s. Injecting ToolMessages to fix state.", len(missing_ids), thread_id)
                         # Inject ToolMessages for all missing tool calls
                         tool_messages = []
                         for tool_call in msg.tool_calls:
@@ -133,117 +269,379 @@ async def ask_question(q: Question):
                     # Only check the most recent AIMessage with tool_calls
                     break
     except Exception as e:
-        print(f"Error checking/fixing state: {e}")
+        logger.error("Error checking/fixing state: %s", e)
+
+def _rate_limit_error(e):
+    """
+    HTTP 429 for an AI provider rate-limit error that outlasted the client's
+    own retries, passing on the provider's Retry-After; None for other errors.
+    """
+    if getattr(e, "status_code", None) != 429:
+        return None
+    response = getattr(e, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    return HTTPException(
+        status_code=429,
+        detail="AI provider rate limit reached. Please try again shortly.",
+        headers={"Retry-After": retry_after} if retry_after else None
+    )
+
+async def _save_conversation(q: Question, thread_id: str, title, message_count: int):
+    """Upsert the Laravel conversation for a thread; returns its data or None."""
+    conversation_data = await save_conversation_metadata_async(
+        user_id=q.user_id,
+        thread_id=thread_id,
+        title=title,
+        message_count=message_count,
+        project_id=q.project_id
+    )
+    if conversation_data:
+        conversation_writer.remember(thread_id, conversation_data.get('id'))
+    return conversation_data
+
+async def _create_conversation(q: Question, thread_id: str, title: str, message_count: int):
+    """
+    Create the Laravel conversation and its solution for a new thread.
+    Raises on failure so conversation_setup_queue retries it; both Laravel
+    endpoints are idempotent.
+    """
+    conversation_data = await _save_conversation(q, thread_id, title, message_count)
+    if not conversation_data:
+        raise RuntimeError(f"Could not save conversation {thread_id}")
+    solution_data = await create_solution_async(
+        conversation_id=conversation_data.get('id'),
+        user_id=q.user_id,
+        title=title or "New Solution",
+        description=f"Solution for: {q.question[:100]}",
+        project_id=q.project_id
+    )
+    if not solution_data:
+        raise RuntimeError(f"Could not create the solution of conversation {thread_id}")
+
+async def _complete_ask(q: Question, thread_id: str, is_new_conversation: bool, result):
+    """
+    Persist conversation metadata after a graph run and build the /ask response.
+    """
+    # Get the last message from the conversation
+    last_message = result['messages'][-1]
+
+    # Count total messages in this conversation
+    message_count = len(result['messages'])
+
+    # Generate title from first user message for new conversations
+    title = None
+    if is_new_conversation:
+        # Use first 50 characters of the question as title
+        title = q.question[:50] + ("..." if len(q.question) > 50 else "")
+
+    # Extract requirements/solution from tool calls to return to Laravel
+    # This avoids deadlock by letting Laravel handle the persistence
+    # Only this turn's messages (after the question) are scanned, newest
+    # first; documents saved in earlier turns were returned back then.
+    requirements_data = None
+    solution_data = None
+
+    for msg in reversed(result['messages']):
+        if isinstance(msg, HumanMessage):
+            break
+        # Check if this is an AIMessage with tool calls
+        for tool_call in getattr(msg, 'tool_calls', None) or ():
+            tool_name = tool_call.get('name')
+            tool_args = tool_call.get('args', {})
+
+            # Capture requirements if save_requirements was called
+            if tool_name == 'save_requirements' and requirements_data is None:
+                requirements_data = tool_args.get('requirements')
+
+            # Capture solution if save_solution was called
+            elif tool_name == 'save_solution' and solution_data is None:
+                solution_data = tool_args.get('solution')
+
+    # Laravel attaches returned requirements/solution documents to the
+    # conversation row right after this response, so that row must exist by
+    # then. Otherwise nothing in the response depends on the new
+    # conversation's records, and they are created in the background.
+    # Later turns only update the message count, batched as well, once the
+    # conversation is known to exist; until then (setup still queued or
+    # failed, or this process restarted) they upsert it before responding.
+    if is_new_conversation:
+        if requirements_data or solution_data:
+            try:
+                await _create_conversation(q, thread_id, title, message_count)
+            except Exception as e:
+                logger.warning("Conversation setup failed, queued for retry: %s", e)
+                conversation_setup_queue.submit(_create_conversation, q, thread_id, title, message_count)
+        else:
+            conversation_setup_queue.submit(_create_conversation, q, thread_id, title, message_count)
+    elif conversation_writer.conversation_id(thread_id) is None:
+        await _save_conversation(q, thread_id, None, message_count)
+    else:
+        conversation_writer.submit(thread_id, message_count)
+
+    # Determine if the conversation has ended or is waiting for more input
+    # The graph returns END when it needs user input
+    status = "completed"
+
+    # Capture Q&A pair for self-learning (async, non-blocking)
+    # Only capture if it's a meaningful Q&A (not tool calls)
+    if last_message.content and not requirements_data and not solution_data:
+        # Fire and forget - queued for the background worker. A new
+        # conversation's capture is queued behind its creation, so the
+        # conversation ID is known by the time it is sent.
+        queue = conversation_setup_queue if is_new_conversation else qa_capture_queue
+        queue.submit(
+            capture_qa_pair,
+            question=q.question,
+            answer=last_message.content,
+            thread_id=thread_id,
+            agent_type="requirement_agent",
+            confidence_score=0.8
+        )
+
+    return {
+        "response": last_message.content,
+        "thread_id": thread_id,
+        "status": status,
+        "message_count": message_count,
+        "requirements": requirements_data,
+        "solution": solution_data
+    }
+
+@app.post("/ask")
+async def ask_question(q: Question):
+    """
+    Process a question through the multi-agent system.
+    Conversation state is preserved using the thread_id.
+    Messages are stored in Redis, metadata in MySQL.
+    """
+    # Generate or use existing thread_id for conversation continuity
+    thread_id = q.thread_id or str(uuid.uuid4())
+    is_new_conversation = q.thread_id is None
+
+    config = _ask_config(q, thread_id)
 
     # Create input message
     inputs = {"messages": [HumanMessage(content=q.question)]}
 
-    try:
+    def run_graph():
+        if not is_new_conversation:
+            _heal_if_needed(config, thread_id)
         # Invoke the graph with checkpointer support
         # The graph will maintain conversation state across requests using the thread_id
         # Messages are automatically saved to Redis by RedisSaver
-        result = app_graph.invoke(inputs, config=config)
-
-        # Get the last message from the conversation
-        last_message = result['messages'][-1]
-
-        # Count total messages in this conversation
-        message_count = len(result['messages'])
+        try:
+            return app_graph.invoke(inputs, config=config, durability=CHECKPOINT_DURABILITY)
+        except Exception:
+            _mark_needs_heal(thread_id)
+            raise
 
-        # Generate title from first user message for new conversations
-        title = None
-        if is_new_conversation:
-            # Use first 50 characters of the question as title
-            title = q.question[:50] + ("..." if len(q.question) > 50 else "")
-
-        # Save conversation metadata to MySQL
-        conversation_data = save_conversation_metadata(
-            user_id=q.user_id,
-            thread_id=thread_id,
-            title=title,
-            message_count=message_count,
-            project_id=q.project_id
-        )
-
-        # Create solution for new conversations
-        if is_new_conversation and conversation_data:
-            create_solution(
-                conversation_id=conversation_data.get('id'),
-                user_id=q.user_id,
-                title=title or "New Solution",
-                description=f"Solution for: {q.question[:100]}",
-                project_id=q.project_id
-            )
-
-        # Extract requirements/solution from tool calls to return to Laravel
-        # This avoids deadlock by letting Laravel handle the persistence
-        requirements_data = None
-        solution_data = None
-        
-        for msg in result['messages']:
-            # Check if this is an AIMessage with tool calls
-            if hasattr(msg, 'tool_calls') and msg.tool_calls:
-                for tool_call in msg.tool_calls:
-                    tool_name = tool_call.get('name')
-                    tool_args = tool_call.get('args', {})
-                    
-                    # Capture requirements if save_requirements was called
-                    if tool_name == 'save_requirements' and 'requirements' in tool_args:
-                        requirements_data = tool_args['requirements']
-                    
-                    # Capture solution if save_solution was called
-                    elif tool_name == 'save_solution' and 'solution' in tool_args:
-                        solution_data = tool_args['solution']
-
-        # Determine if the conversation has ended or is waiting for more input
-        # The graph returns END when it needs user input
-        status = "completed"
-
-        # Capture Q&A pair for self-learning (async, non-blocking)
-        # Only capture if it's a meaningful Q&A (not tool calls)
-        if last_message.content and not requirements_data and not solution_data:
-            conversation_id = conversation_data.get('id') if conversation_data else None
-            # Fire and forget - don't wait for completion
-            import asyncio
-            asyncio.create_task(capture_qa_pair(
-                question=q.question,
-                answer=last_message.content,
-                thread_id=thread_id,
-                conversation_id=conversation_id,
-                agent_type="requirement_agent",
-                confidence_score=0.8
-            ))
-
-        return {
-            "response": last_message.content,
-            "thread_id": thread_id,
-            "status": status,
-            "message_count": message_count,
-            "requirements": requirements_data,
-            "solution": solution_data
-        }
+    try:
+        # The graph, its tools and the checkpointer are synchronous; running
+        # them in a worker thread keeps the event loop free for other requests
+        result = await asyncio.to_thread(run_graph)
+        return await _complete_ask(q, thread_id, is_new_conversation, result)
     except ValueError as e:
         # Handle configuration errors (missing API keys, etc.)
         error_message = str(e)
-        print(f"Configuration error: {error_message}")
+        logger.warning("Configuration error: %s", error_message)
         raise HTTPException(
             status_code=400,
             detail=error_message
         )
     except Exception as e:
-        import traceback
-        error_details = traceback.format_exc()
-        print(f"Error processing question: {error_details}")
+        rate_limited = _rate_limit_error(e)
+        if rate_limited is not None:
+            logger.warning("AI provider rate limit for thread %s: %s", thread_id, e)
+            raise rate_limited
+        logger.exception("Error processing question")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Upper bound on questions per /ask/batch request, and how many of them run at once
+ASK_BATCH_MAX_ITEMS = int(os.getenv("ASK_BATCH_MAX_ITEMS", "20"))
+ASK_BATCH_CONCURRENCY = int(os.getenv("ASK_BATCH_CONCURRENCY", "10"))
+
+@app.post("/ask/batch")
+async def ask_questions_batch(batch: BatchQuestion):
+    """
+    Process several questions in one request, concurrently.
+
+    Each item is handled like a separate /ask call on its own thread; the
+    response lists one /ask result per item, in order. An item that fails
+    carries {"error": "..."} instead, without failing the others.
+    """
+    items = batch.items
+    if not items:
+        raise HTTPException(status_code=400, detail="No questions given")
+    if len(items) > ASK_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {ASK_BATCH_MAX_ITEMS} questions per batch"
+        )
+    existing_threads = [q.thread_id for q in items if q.thread_id]
+    if len(existing_threads) != len(set(existing_threads)):
+        # Runs on the same thread would overwrite each other's checkpoint
+        raise HTTPException(status_code=400, detail="Duplicate thread_id in batch")
+
+    thread_ids = [q.thread_id or str(uuid.uuid4()) for q in items]
+    configs = [
+        {**_ask_config(q, thread_id), "max_concurrency": ASK_BATCH_CONCURRENCY}
+        for q, thread_id in zip(items, thread_ids)
+    ]
+    inputs = [{"messages": [HumanMessage(content=q.question)]} for q in items]
+
+    def run_graphs():
+        for q, config, thread_id in zip(items, configs, thread_ids):
+            if q.thread_id is not None:
+                _heal_if_needed(config, thread_id)
+        # One worker thread fans the runs out over the graph's own executor
+        results = app_graph.batch(
+            inputs,
+            config=configs,
+            return_exceptions=True,
+            durability=CHECKPOINT_DURABILITY
+        )
+        for thread_id, result in zip(thread_ids, results):
+            if isinstance(result, Exception):
+                _mark_needs_heal(thread_id)
+        return results
+
+    async def complete(q, thread_id, result):
+        if isinstance(result, Exception):
+            if not isinstance(result, ValueError):
+                logger.error("Error processing batched question: %s", result)
+            return {"thread_id": thread_id, "error": str(result)}
+        try:
+            return await _complete_ask(q, thread_id, q.thread_id is None, result)
+        except Exception as e:
+            logger.exception("Error saving batched answer")
+            return {"thread_id": thread_id, "error": str(e)}
+
+    results = await asyncio.to_thread(run_graphs)
+    return {
+        "results": await asyncio.gather(*(
+            complete(q, thread_id, result)
+            for q, thread_id, result in zip(items, thread_ids, results)
+        ))
+    }
+
+# Keep proxies (nginx) and browsers from buffering or caching the event stream
+_SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def _sse(event):
+    return b"data: " + orjson.dumps(event) + b"\n\n"
+
+@app.post("/ask/stream")
+async def ask_question_stream(q: Question):
+    """
+    Same as /ask, but streams the agent's reply as Server-Sent Events.
+
+    Events:
+        {"type": "token", "content": "..."}    while the reply is generated
+        {"type": "done", ...}                  the /ask response, once persisted
+        {"type": "error", "detail": "..."}     if the run fails
+    """
+    thread_id = q.thread_id or str(uuid.uuid4())
+    is_new_conversation = q.thread_id is None
+
+    config = _ask_config(q, thread_id)
+
+    inputs = {"messages": [HumanMessage(content=q.question)]}
+
+    loop = asyncio.get_running_loop()
+    tokens = asyncio.Queue()
+    end_of_stream = object()
+
+    def run_graph():
+        # The graph and its checkpointer are synchronous, so the run happens
+        # in a worker thread and hands tokens to the event loop as they arrive
+        result = None
+        try:
+            if not is_new_conversation:
+                _heal_if_needed(config, thread_id)
+            for mode, payload in app_graph.stream(
+                inputs,
+                config=config,
+                stream_mode=["messages", "values"],
+                durability=CHECKPOINT_DURABILITY
+            ):
+                if mode == "values":
+                    result = payload
+                    continue
+                chunk, metadata = payload
+                text = chunk_text(chunk)
+                if text and metadata.get("langgraph_node") == "requirement_agent":
+                    loop.call_soon_threadsafe(tokens.put_nowait, text)
+        except Exception:
+            _mark_needs_heal(thread_id)
+            raise
+        finally:
+            loop.call_soon_threadsafe(tokens.put_nowait, end_of_stream)
+        return result
+
+    async def events():
+        run = asyncio.ensure_future(asyncio.to_thread(run_graph))
+        try:
+            while True:
+                token = await tokens.get()
+                if token is end_of_stream:
+                    break
+                yield _sse({"type": "token", "content": token})
+
+            result = await run
+            response = await _complete_ask(q, thread_id, is_new_conversation, result)
+            yield _sse({"type": "done", **response})
+        except ValueError as e:
+            logger.warning("Configuration error: %s", e)
+            yield _sse({"type": "error", "detail": str(e)})
+        except Exception as e:
+            rate_limited = _rate_limit_error(e)
+            if rate_limited is not None:
+                logger.warning("AI provider rate limit for thread %s: %s", thread_id, e)
+                yield _sse({"type": "error", "status": 429, "detail": rate_limited.detail})
+                return
+            logger.exception("Error streaming answer")
+            yield _sse({"type": "error", "detail": str(e)})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=_SSE_HEADERS)
+
+# Message types shown in the conversation history, by exact type
+_CONVERSATION_ROLES = {HumanMessage: "user", AIMessage: "assistant"}
+
+# Filtered histories by (thread_id, checkpoint_id); a checkpoint never changes,
+# so an entry stays valid until the thread moves on to a new checkpoint
+_conversation_cache = LRUCache(maxsize=256)
+_conversation_cache_lock = threading.Lock()
+
+def _conversation_messages(messages):
+    # Convert messages to serializable format, keeping only conversational
+    # HumanMessage and AIMessage: tool results (they have a 'name' set) and AI
+    # messages calling tools (internal orchestration) are left out
+    return [
+        {
+            "id": msg.id,
+            "role": role,
+            "content": msg.content,
+            "timestamp": getattr(msg, 'timestamp', None)
+        }
+        for msg, role in zip(messages, map(_CONVERSATION_ROLES.get, map(type, messages)))
+        if role is not None and not msg.name and not (role == "assistant" and msg.tool_calls)
+    ]
+
 @app.get("/conversation/{thread_id}")
-def get_conversation(thread_id: str):
+def get_conversation(
+    thread_id: str,
+    request: Request,
+    limit: Optional[int] = Query(default=None, ge=1),
+    before: Optional[str] = None
+):
     """
     Retrieve conversation history for a given thread_id from Redis checkpoint.
+
+    Pass `limit` for only the latest messages, and `before` (a message id) to
+    page further back; an id not in the conversation gets a 404. The ETag is the thread's checkpoint, so polling with
+    If-None-Match gets a 304 until the conversation changes.
     """
     try:
-        from app.graph import app_graph
-        
         # Get the state for this thread
         config = {"configurable": {"thread_id": thread_id}}
         
@@ -256,41 +654,67 @@ def get_conversation(thread_id: str):
                 "messages": [],
                 "message_count": 0
             }
+
+        checkpoint_id = state.config["configurable"].get("checkpoint_id")
+        etag = f'"{checkpoint_id}"'
+        if checkpoint_id and request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+
+        key = (thread_id, checkpoint_id)
+        with _conversation_cache_lock:
+            messages = _conversation_cache.get(key)
+        if messages is None:
+            messages = _conversation_messages(state.values['messages'])
+            if checkpoint_id:
+                with _conversation_cache_lock:
+                    _conversation_cache[key] = messages
+
+        message_count = len(messages)
+        end = message_count
+        if before is not None:
+            end = next((i for i, msg in enumerate(messages) if msg["id"] == before), None)
+            if end is None:
+                # Falling back to the newest page would repeat messages for
+                # a client paging backwards
+                raise HTTPException(status_code=404, detail=f"Message {before} not found in conversation")
+        start = max(0, end - limit) if limit else 0
+
+        # Returned as a response object so the (possibly long) history goes
+        # straight to orjson, skipping FastAPI's jsonable_encoder pass
+        return ORJSONResponse(
+            {
+                "thread_id": thread_id,
+                "messages": messages[start:end],
+                "message_count": message_count,
+                "has_more": start > 0
+            },
+            headers={"ETag": etag} if checkpoint_id else None
+        )
         
-        # Convert messages to serializable format
-        # Filter out tool messages and internal orchestration
-        messages = []
-        for msg in state.values['messages']:
-            msg_class = msg.__class__.__name__
-
-            # Skip tool result messages (they have a 'name' attribute set)
-            if hasattr(msg, 'name') and msg.name:
-                continue
-
-            # Skip AI messages that are calling tools (internal orchestration)
-            if msg_class == "AIMessage" and hasattr(msg, 'tool_calls') and msg.tool_calls:
-                continue
-
-            # Only include conversational HumanMessage and AIMessage
-            if msg_class in ["HumanMessage", "AIMessage"]:
-                messages.append({
-                    "role": "user" if msg_class == "HumanMessage" else "assistant",
-                    "content": msg.content,
-                    "timestamp": getattr(msg, 'timestamp', None)
-                })
-        
-        return {
-            "thread_id": thread_id,
-            "messages": messages,
-            "message_count": len(messages)
-        }
-        
+    except HTTPException:
+        raise
     except Exception as e:
-        import traceback
-        error_details = traceback.format_exc()
-        print(f"Error retrieving conversation: {error_details}")
+        logger.exception("Error retrieving conversation")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/internal/ai-settings/invalidate")
+def invalidate_ai_settings(request: dict):
+    """
+    Called by Laravel after a user updates their AI settings so the cached
+    provider/API key is not served until it expires.
+
+    Request body:
+    {
+        "user_id": 2
+    }
+    """
+    user_id = request.get('user_id')
+    if user_id is None:
+        raise HTTPException(status_code=400, detail="user_id is required")
+
+    invalidate_llm_config(user_id)
+    return {"success": True}
+
 @app.post("/publish")
 async def publish_solution(request: dict):
     """
@@ -309,9 +733,6 @@ async def publish_solution(request: dict):
     }
     """
     try:
-        from app.services.developer_service import generate_technical_solution
-        from app.database import save_solution_to_laravel
-
         thread_id = request.get('thread_id')
         requirements = request.get('requirements')
         user_id = request.get('user_id', 2)
@@ -324,8 +745,8 @@ async def publish_solution(request: dict):
                 detail="thread_id and requirements are required"
             )
 
-        print(f"📝 Publishing solution for thread: {thread_id}")
-        print(f"📄 Requirements length: {len(requirements)} characters")
+        logger.info("Publishing solution for thread %s", thread_id)
+        logger.debug("Requirements length: %s characters", len(requirements))
 
         # Generate comprehensive technical solution
         result = await generate_technical_solution(
@@ -339,33 +760,33 @@ async def publish_solution(request: dict):
 
         # Save to Laravel database
         technical_solution = result['technical_solution']
-        save_result = save_solution_to_laravel(thread_id, technical_solution)
+        save_result = await save_solution_to_laravel_async(thread_id, technical_solution)
 
         if save_result:
-            print(f"✅ Solution saved to database for thread {thread_id}")
+            logger.info("Solution saved to database for thread %s", thread_id)
         else:
-            print(f"⚠️ Failed to save solution to database")
+            logger.warning("Failed to save solution to database for thread %s", thread_id)
 
         return {
             "success": True,
             "message": "Technical solution generated successfully",
             "thread_id": thread_id,
             "solution": technical_solution,
+            "sections": result.get('sections'),
             "metadata": {
                 "model_used": result.get('model_used'),
                 "word_count": result.get('word_count'),
-                "char_count": result.get('char_count')
+                "char_count": result.get('char_count'),
+                "usage": result.get('usage')
             }
         }
 
     except ValueError as e:
         error_message = str(e)
-        print(f"Configuration error: {error_message}")
+        logger.warning("Configuration error: %s", error_message)
         raise HTTPException(status_code=400, detail=error_message)
     except Exception as e:
-        import traceback
-        error_details = traceback.format_exc()
-        print(f"Error generating solution: {error_details}")
+        logger.exception("Error generating solution")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/republish")
@@ -386,9 +807,6 @@ async def republish_solution(request: dict):
     }
     """
     try:
-        from app.services.developer_service import generate_technical_solution
-        from app.database import save_solution_to_laravel
-
         thread_id = request.get('thread_id')
         requirements = request.get('requirements')
         user_id = request.get('user_id', 2)
@@ -401,7 +819,7 @@ async def republish_solution(request: dict):
                 detail="thread_id and requirements are required"
             )
 
-        print(f"🔄 Republishing solution for thread: {thread_id}")
+        logger.info("Republishing solution for thread %s", thread_id)
 
         # Regenerate technical solution
         result = await generate_technical_solution(
@@ -415,32 +833,97 @@ async def republish_solution(request: dict):
 
         # Save to Laravel database
         technical_solution = result['technical_solution']
-        save_result = save_solution_to_laravel(thread_id, technical_solution)
+        save_result = await save_solution_to_laravel_async(thread_id, technical_solution)
 
         if save_result:
-            print(f"✅ Solution updated in database for thread {thread_id}")
+            logger.info("Solution updated in database for thread %s", thread_id)
         else:
-            print(f"⚠️ Failed to update solution in database")
+            logger.warning("Failed to update solution in database for thread %s", thread_id)
 
         return {
             "success": True,
             "message": "Technical solution regenerated successfully",
             "thread_id": thread_id,
             "solution": technical_solution,
+            "sections": result.get('sections'),
             "metadata": {
                 "model_used": result.get('model_used'),
                 "word_count": result.get('word_count'),
                 "char_count": result.get('char_count'),
+                "usage": result.get('usage'),
                 "is_republish": True
             }
         }
 
     except ValueError as e:
         error_message = str(e)
-        print(f"Configuration error: {error_message}")
+        logger.warning("Configuration error: %s", error_message)
         raise HTTPException(status_code=400, detail=error_message)
     except Exception as e:
-        import traceback
-        error_details = traceback.format_exc()
-        print(f"Error regenerating solution: {error_details}")
+        logger.exception("Error regenerating solution")
         raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/publish/stream")
+async def publish_solution_stream(request: dict):
+    """
+    Same as /publish (or /republish with "is_republish": true), but streams
+    the technical solution as Server-Sent Events while it is written.
+
+    Events:
+        {"type": "token", "content": "..."}    while the document is generated
+        {"type": "done", ...}                  the /publish response, once saved
+        {"type": "error", "detail": "..."}     if generation fails
+    """
+    thread_id = request.get('thread_id')
+    requirements = request.get('requirements')
+    is_republish = bool(request.get('is_republish', False))
+
+    if not thread_id or not requirements:
+        raise HTTPException(
+            status_code=400,
+            detail="thread_id and requirements are required"
+        )
+
+    async def events():
+        try:
+            result = None
+            async for kind, payload in stream_technical_solution(
+                thread_id=thread_id,
+                requirements=requirements,
+                user_id=request.get('user_id', 2),
+                ai_provider=request.get('ai_provider'),
+                ai_api_key=request.get('ai_api_key'),
+                is_republish=is_republish
+            ):
+                if kind == "token":
+                    yield _sse({"type": "token", "content": payload})
+                else:
+                    result = payload
+
+            technical_solution = result['technical_solution']
+            if await save_solution_to_laravel_async(thread_id, technical_solution):
+                logger.info("Solution saved to database for thread %s", thread_id)
+            else:
+                logger.warning("Failed to save solution to database for thread %s", thread_id)
+
+            yield _sse({
+                "type": "done",
+                "success": True,
+                "thread_id": thread_id,
+                "solution": technical_solution,
+                "metadata": {
+                    "model_used": result.get('model_used'),
+                    "word_count": result.get('word_count'),
+                    "char_count": result.get('char_count'),
+                    "usage": result.get('usage'),
+                    "is_republish": is_republish
+                }
+            })
+        except ValueError as e:
+            logger.warning("Configuration error: %s", e)
+            yield _sse({"type": "error", "detail": str(e)})
+        except Exception as e:
+            logger.exception("Error streaming solution")
+            yield _sse({"type": "error", "detail": str(e)})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=_SSE_HEADERS)
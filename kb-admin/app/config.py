@@ -25,6 +25,7 @@ class Settings(BaseSettings):
     DB_USERNAME: str = os.getenv("DB_USERNAME", "root")
     DB_PASSWORD: str = os.getenv("DB_PASSWORD", "root")
     DB_DATABASE: str = os.getenv("DB_DATABASE", "laravel")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "16"))
 
     # External services
     LARAVEL_API_URL: str = os.getenv("LARAVEL_API_URL", "http://laravel-app-dev:8000")
@@ -56,7 +57,8 @@ class Settings(BaseSettings):
     AUTO_APPROVE_THRESHOLD: float = 0.95  # Future: auto-approve high confidence
 
     # Rate limiting
-    EMBEDDING_BATCH_SIZE: int = 50
+    EMBEDDING_BATCH_SIZE: int = 500
+    VECTOR_UPSERT_BATCH_SIZE: int = 500
     EMBEDDING_RATE_LIMIT_PER_MIN: int = 100
 
     class Config:
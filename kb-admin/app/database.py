@@ -7,11 +7,13 @@ from contextlib import contextmanager
 from typing import Generator, Optional
 from app.config import settings
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
 # Connection pool for better performance
 _connection_pool: Optional[pooling.MySQLConnectionPool] = None
+_connection_pool_lock = threading.Lock()
 
 
 def get_connection_pool() -> pooling.MySQLConnectionPool:
@@ -21,26 +23,35 @@ def get_connection_pool() -> pooling.MySQLConnectionPool:
     global _connection_pool
 
     if _connection_pool is None:
-        try:
-            _connection_pool = pooling.MySQLConnectionPool(
-                pool_name="kb_admin_pool",
-                pool_size=10,
-                pool_reset_session=True,
-                host=settings.DB_HOST,
-                port=settings.DB_PORT,
-                user=settings.DB_USERNAME,
-                password=settings.DB_PASSWORD,
-                database=settings.DB_DATABASE,
-                autocommit=False,
-            )
-            logger.info(f"MySQL connection pool created: {settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_DATABASE}")
-        except mysql.connector.Error as e:
-            logger.error(f"Failed to create connection pool: {e}")
-            raise
+        with _connection_pool_lock:
+            if _connection_pool is None:
+                _connection_pool = _create_connection_pool()
 
     return _connection_pool
 
 
+def _create_connection_pool() -> pooling.MySQLConnectionPool:
+    try:
+        # Every checkout ends in commit() or rollback() and no session
+        # variables are set, so skip the reset round trip on each checkout
+        pool = pooling.MySQLConnectionPool(
+            pool_name="kb_admin_pool",
+            pool_size=settings.DB_POOL_SIZE,
+            pool_reset_session=False,
+            host=settings.DB_HOST,
+            port=settings.DB_PORT,
+            user=settings.DB_USERNAME,
+            password=settings.DB_PASSWORD,
+            database=settings.DB_DATABASE,
+            autocommit=False,
+        )
+        logger.info(f"MySQL connection pool created: {settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_DATABASE}")
+        return pool
+    except mysql.connector.Error as e:
+        logger.error(f"Failed to create connection pool: {e}")
+        raise
+
+
 @contextmanager
 def get_db_connection() -> Generator:
     """
@@ -7,13 +7,23 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
 from app.database import test_connection as test_db_connection
 from app.redis_client import test_redis_connection
+import atexit
 import logging
-
-# Configure logging
+import logging.handlers
+import queue
+
+# Configure logging. Records are queued by the calling thread and written to
+# stdout by a listener thread, so request handlers never block on console I/O.
+_log_queue = queue.Queue(-1)
+_console_handler = logging.StreamHandler()
+_console_handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
 logging.basicConfig(
     level=logging.INFO if not settings.DEBUG else logging.DEBUG,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    handlers=[logging.handlers.QueueHandler(_log_queue)]
 )
+_log_listener = logging.handlers.QueueListener(_log_queue, _console_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)
 
 logger = logging.getLogger(__name__)
 
@@ -99,6 +99,12 @@ def create_vector_index(
                     "DIM": vector_dims,
                     "DISTANCE_METRIC": distance_metric,
                     "INITIAL_CAP": 1000,
+                    # Graph degree and build-time candidate list; EF_RUNTIME
+                    # covers the up to 10 candidates fetched when the
+                    # idea-agent grades results
+                    "M": 16,
+                    "EF_CONSTRUCTION": 200,
+                    "EF_RUNTIME": 20,
                 }
             ),
         )
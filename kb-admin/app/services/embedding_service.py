@@ -5,11 +5,45 @@ Generates embeddings using OpenAI or Anthropic
 from langchain_openai import OpenAIEmbeddings
 from typing import List, Optional
 from app.config import settings
+import hashlib
+import httpx
 import logging
+import threading
 import time
 
 logger = logging.getLogger(__name__)
 
+# API keys fetched from Laravel, per provider: (api_key, expires_at).
+# Vectorization builds a new EmbeddingService per job, so without this every
+# job re-fetched the key; the per-provider lock lets only one caller fetch it
+# while concurrent callers wait for that result.
+_LARAVEL_KEY_TTL = 300
+_laravel_keys = {}
+_laravel_key_locks = {"openai": threading.Lock(), "anthropic": threading.Lock()}
+
+# Keep-alive client for the Laravel internal API, shared by every key fetch
+_laravel_client = httpx.Client(
+    base_url=settings.LARAVEL_API_URL,
+    timeout=5.0,
+    headers={"Accept": "application/json"}
+)
+
+# OpenAIEmbeddings clients per (model, sha256 of the API key). Each client owns
+# an HTTP connection pool, so reusing it across vectorization jobs keeps the
+# TLS connection to the provider warm instead of opening a new one per job.
+_embeddings_clients = {}
+_embeddings_clients_lock = threading.Lock()
+
+
+def _get_openai_embeddings(api_key: Optional[str], model: str) -> OpenAIEmbeddings:
+    key = (model, hashlib.sha256((api_key or "").encode()).hexdigest())
+    with _embeddings_clients_lock:
+        client = _embeddings_clients.get(key)
+        if client is None:
+            client = OpenAIEmbeddings(openai_api_key=api_key, model=model)
+            _embeddings_clients[key] = client
+    return client
+
 
 class EmbeddingService:
     """Service for generating text embeddings"""
@@ -44,24 +78,7 @@ class EmbeddingService:
             return settings.ANTHROPIC_API_KEY
         
         # Fetch from Laravel app's AI settings
-        try:
-            import requests
-            laravel_url = settings.LARAVEL_API_URL
-            response = requests.get(f"{laravel_url}/api/internal/api-keys/{self.provider}", timeout=5)
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('has_key'):
-                    logger.info(f"Retrieved {self.provider} API key from Laravel app")
-                    return data.get('api_key')
-            elif response.status_code == 404:
-                logger.warning(f"No {self.provider} API key found in Laravel app")
-            else:
-                logger.error(f"Failed to fetch API key from Laravel: {response.status_code}")
-        except Exception as e:
-            logger.error(f"Error fetching API key from Laravel: {e}")
-        
-        return None
+        return _get_laravel_api_key(self.provider)
 
     def _get_default_model(self) -> str:
         """Get default model for provider"""
@@ -76,19 +93,13 @@ class EmbeddingService:
     def _initialize_embeddings(self):
         """Initialize embedding model"""
         if self.provider == "openai":
-            return OpenAIEmbeddings(
-                openai_api_key=self.api_key,
-                model=self.model
-            )
+            return _get_openai_embeddings(self.api_key, self.model)
         elif self.provider == "anthropic":
             # Note: Anthropic doesn't have official embedding API yet
             # In production, you'd use a different embedding service
             # For now, fallback to OpenAI or use a local model
             logger.warning("Anthropic embeddings not officially supported, using OpenAI as fallback")
-            return OpenAIEmbeddings(
-                openai_api_key=settings.OPENAI_API_KEY,
-                model="text-embedding-3-small"
-            )
+            return _get_openai_embeddings(settings.OPENAI_API_KEY, "text-embedding-3-small")
         else:
             raise ValueError(f"Unsupported embedding provider: {self.provider}")
 
@@ -173,6 +184,45 @@ class EmbeddingService:
         return 1536
 
 
+def _get_laravel_api_key(provider: str) -> Optional[str]:
+    """
+    API key for the provider from the Laravel app, cached for a few minutes
+    """
+    cached = _laravel_keys.get(provider)
+    if cached and cached[1] > time.monotonic():
+        return cached[0]
+
+    with _laravel_key_locks.get(provider, threading.Lock()):
+        # Another caller may have fetched it while we waited for the lock
+        cached = _laravel_keys.get(provider)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+
+        api_key = _fetch_laravel_api_key(provider)
+        if api_key:
+            _laravel_keys[provider] = (api_key, time.monotonic() + _LARAVEL_KEY_TTL)
+        return api_key
+
+
+def _fetch_laravel_api_key(provider: str) -> Optional[str]:
+    try:
+        response = _laravel_client.get(f"/api/internal/api-keys/{provider}")
+        
+        if response.status_code == 200:
+            data = response.json()
+            if data.get('has_key'):
+                logger.info(f"Retrieved {provider} API key from Laravel app")
+                return data.get('api_key')
+        elif response.status_code == 404:
+            logger.warning(f"No {provider} API key found in Laravel app")
+        else:
+            logger.error(f"Failed to fetch API key from Laravel: {response.status_code}")
+    except Exception as e:
+        logger.error(f"Error fetching API key from Laravel: {e}")
+    
+    return None
+
+
 def get_embedding_service(
     provider: str = "openai",
     api_key: Optional[str] = None,
@@ -8,8 +8,11 @@ from app.models.learned_knowledge import (
 )
 from typing import List, Optional
 import json
+import logging
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 
 class LearnedKnowledgeService:
     """Service for managing learned knowledge"""
@@ -172,7 +175,7 @@ class LearnedKnowledgeService:
             kb = KBService.get_active_kb_by_agent(knowledge.agent_type)
         except ValueError:
             # No active KB for this agent, skip vectorization
-            print(f"No active KB found for agent type: {knowledge.agent_type}")
+            logger.info("No active KB found for agent type: %s", knowledge.agent_type)
             return
 
         # Format the knowledge as markdown document
@@ -211,7 +214,7 @@ class LearnedKnowledgeService:
         # Vectorize the document
         VectorizationService.vectorize_document(doc.id)
 
-        print(f"✅ Learned knowledge {knowledge_id} vectorized and added to KB {kb.id}")
+        logger.info("Learned knowledge %s vectorized and added to KB %s", knowledge_id, kb.id)
 
     @staticmethod
     def update_knowledge(
@@ -7,6 +7,7 @@ from app.services.document_service import DocumentService
 from app.services.embedding_service import get_embedding_service
 from app.utils.chunking import ChunkingService
 from app.redis_client import get_redis_client
+from app.config import settings
 from app.models.document import DocumentStatus
 from typing import List, Dict, Optional
 import logging
@@ -185,6 +186,11 @@ class VectorizationService:
             embeddings: List of embedding vectors
         """
         redis_client = get_redis_client()
+        # Non-transactional pipeline flushed every VECTOR_UPSERT_BATCH_SIZE
+        # chunks: one round trip per batch, without buffering a whole large
+        # document in a single request
+        pipe = redis_client.pipeline(transaction=False)
+        batch_size = settings.VECTOR_UPSERT_BATCH_SIZE
 
         for idx, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
             # Create unique key for this chunk
@@ -204,10 +210,13 @@ class VectorizationService:
                 "embedding": embedding_bytes
             }
 
-            # Store in Redis
-            redis_client.hset(chunk_key, mapping=redis_data)
+            pipe.hset(chunk_key, mapping=redis_data)
 
-            logger.debug(f"Stored vector {chunk_key}")
+            if (idx + 1) % batch_size == 0:
+                pipe.execute()
+                logger.debug(f"Stored vectors {idx + 2 - batch_size}-{idx + 1} of document {doc_id}")
+
+        pipe.execute()
 
         logger.info(f"Stored {len(chunks)} vectors in Redis index {index_name}")
 
@@ -6,6 +6,7 @@
 use App\Models\Conversation;
 use Illuminate\Http\JsonResponse;
 use Illuminate\Http\Request;
+use Illuminate\Support\Facades\DB;
 
 class ConversationController extends Controller
 {
@@ -24,16 +25,19 @@ public function store(Request $request): JsonResponse
             'last_message' => ['nullable', 'string'],
         ]);
 
-        $conversation = Conversation::updateOrCreate(
-            ['thread_id' => $validated['thread_id']],
-            [
-                'user_id' => $validated['user_id'],
-                'title' => $validated['title'] ?? 'New Conversation',
-                'project_id' => $validated['project_id'] ?? null,
-                'message_count' => $validated['message_count'] ?? 1,
-                'last_message_at' => now(),
-            ]
-        );
+        $conversation = Conversation::firstOrNew(['thread_id' => $validated['thread_id']]);
+
+        // The agent creates conversations in the background and may upsert
+        // them again from a later turn, so saves can arrive out of order:
+        // an omitted title or project keeps the stored one, and the message
+        // count never goes back.
+        $conversation->fill([
+            'user_id' => $validated['user_id'],
+            'title' => $validated['title'] ?? $conversation->title ?? 'New Conversation',
+            'project_id' => $validated['project_id'] ?? $conversation->project_id,
+            'message_count' => max($validated['message_count'] ?? 1, (int) $conversation->message_count),
+            'last_message_at' => now(),
+        ])->save();
 
         return response()->json([
             'success' => true,
@@ -41,6 +45,39 @@ public function store(Request $request): JsonResponse
         ]);
     }
 
+    /**
+     * Update message counts for several existing conversations at once.
+     * The idea-agent batches per-turn updates and flushes them here.
+     */
+    public function bulkUpdate(Request $request): JsonResponse
+    {
+        $validated = $request->validate([
+            'items' => ['required', 'array', 'max:500'],
+            'items.*.thread_id' => ['required', 'string', 'max:255'],
+            'items.*.message_count' => ['required', 'integer'],
+        ]);
+
+        $updated = DB::transaction(function () use ($validated) {
+            $updated = 0;
+
+            foreach ($validated['items'] as $item) {
+                $updated += Conversation::where('thread_id', $item['thread_id'])->update([
+                    'message_count' => $item['message_count'],
+                    'last_message_at' => now(),
+                ]);
+            }
+
+            return $updated;
+        });
+
+        return response()->json([
+            'success' => true,
+            'data' => [
+                'updated' => $updated,
+            ],
+        ]);
+    }
+
     /**
      * Get all conversations for a user.
      */
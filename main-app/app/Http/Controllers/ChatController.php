@@ -55,7 +55,10 @@ public function askAgent(Request $request, Project $project)
                 'user_id' => auth()->id(),
             ]);
 
-            $response = Http::timeout(300)->post("{$agentUrl}/ask", $payload);
+            // Ask for a gzipped response; it may carry whole requirement/solution documents
+            $response = Http::timeout(300)
+                ->withOptions(['decode_content' => 'gzip'])
+                ->post("{$agentUrl}/ask", $payload);
 
             if ($response->successful()) {
                 $data = $response->json();
@@ -141,6 +144,21 @@ public function askAgent(Request $request, Project $project)
                 ], 400);
             }
 
+            // The AI provider is rate limiting this key; let the client back off
+            if ($response->status() === 429) {
+                $data = $response->json();
+
+                Log::warning('AI provider rate limit reached', [
+                    'thread_id' => $threadId,
+                    'user_id' => auth()->id(),
+                ]);
+
+                return response()->json([
+                    'success' => false,
+                    'error' => $data['detail'] ?? 'AI provider rate limit reached. Please try again shortly.',
+                ], 429, array_filter(['Retry-After' => $response->header('Retry-After')]));
+            }
+
             Log::error('AI Agent request failed', [
                 'status' => $response->status(),
                 'body' => $response->body(),
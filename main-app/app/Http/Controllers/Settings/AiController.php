@@ -5,6 +5,8 @@
 use App\Http\Controllers\Controller;
 use Illuminate\Http\RedirectResponse;
 use Illuminate\Http\Request;
+use Illuminate\Support\Facades\Http;
+use Illuminate\Support\Facades\Log;
 use Illuminate\Validation\Rule;
 use Inertia\Inertia;
 use Inertia\Response;
@@ -46,6 +48,28 @@ public function update(Request $request): RedirectResponse
 
         $aiSetting->save();
 
+        $this->invalidateAgentSettingsCache($request->user()->id);
+
         return back()->with('success', 'AI settings updated successfully.');
     }
+
+    /**
+     * Tell the idea-agent to drop its cached copy of the user's AI settings.
+     * Best effort: the agent cache expires on its own if this call fails.
+     */
+    private function invalidateAgentSettingsCache(int $userId): void
+    {
+        $ideaAgentUrl = config('services.idea_agent.url');
+
+        try {
+            Http::timeout(2)->post("{$ideaAgentUrl}/internal/ai-settings/invalidate", [
+                'user_id' => $userId,
+            ]);
+        } catch (\Throwable $e) {
+            Log::warning('Failed to invalidate idea-agent AI settings cache', [
+                'user_id' => $userId,
+                'error' => $e->getMessage(),
+            ]);
+        }
+    }
 }
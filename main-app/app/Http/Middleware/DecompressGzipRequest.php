@@ -0,0 +1,53 @@
+<?php
+
+namespace App\Http\Middleware;
+
+use Closure;
+use Illuminate\Http\Request;
+use Symfony\Component\HttpFoundation\Response;
+
+class DecompressGzipRequest
+{
+    /**
+     * Largest accepted body after decompression (bytes).
+     */
+    private const MAX_DECODED_BYTES = 20 * 1024 * 1024;
+
+    /**
+     * Inflate request bodies sent with "Content-Encoding: gzip".
+     *
+     * The idea-agent compresses large requirements / solution documents
+     * before posting them to the internal API.
+     *
+     * @param  \Closure(\Illuminate\Http\Request): (\Symfony\Component\HttpFoundation\Response)  $next
+     */
+    public function handle(Request $request, Closure $next): Response
+    {
+        if (strtolower((string) $request->header('Content-Encoding')) !== 'gzip') {
+            return $next($request);
+        }
+
+        $decoded = @gzdecode($request->getContent(), self::MAX_DECODED_BYTES);
+
+        if ($decoded === false) {
+            return response()->json([
+                'success' => false,
+                'message' => 'Invalid gzip request body.',
+            ], 400);
+        }
+
+        $request->server->remove('HTTP_CONTENT_ENCODING');
+        $request->initialize(
+            $request->query->all(),
+            $request->request->all(),
+            $request->attributes->all(),
+            $request->cookies->all(),
+            $request->files->all(),
+            $request->server->all(),
+            $decoded
+        );
+        $request->setJson(null);
+
+        return $next($request);
+    }
+}
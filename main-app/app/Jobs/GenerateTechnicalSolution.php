@@ -85,6 +85,7 @@ public function handle(): void
 
             // Call idea-agent service
             $response = Http::timeout(600) // 10 minutes timeout
+                ->withOptions(['decode_content' => 'gzip']) // The solution document comes back gzipped
                 ->post("{$ideaAgentUrl}{$endpoint}", [
                     'thread_id' => $this->solution->conversation->thread_id,
                     'requirements' => $this->solution->requirements,
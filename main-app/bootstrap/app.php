@@ -1,5 +1,6 @@
 <?php
 
+use App\Http\Middleware\DecompressGzipRequest;
 use App\Http\Middleware\HandleAppearance;
 use App\Http\Middleware\HandleInertiaRequests;
 use App\Http\Middleware\SetCurrentProject;
@@ -16,6 +17,9 @@
         health: '/up',
     )
     ->withMiddleware(function (Middleware $middleware): void {
+        // Runs before TrimStrings & co. so they see the decoded payload
+        $middleware->prepend(DecompressGzipRequest::class);
+
         $middleware->encryptCookies(except: ['appearance', 'sidebar_state']);
 
         $middleware->web(append: [
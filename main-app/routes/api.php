@@ -9,6 +9,7 @@
 // Internal API for microservices (unauthenticated)
 Route::get('internal/ai-settings', [AiSettingsApiController::class, 'getSettings']);
 Route::post('internal/conversations', [ConversationController::class, 'store']);
+Route::post('internal/conversations/bulk', [ConversationController::class, 'bulkUpdate']);
 Route::get('internal/conversations', [ConversationController::class, 'index']);
 Route::get('internal/conversations/{threadId}', [ConversationController::class, 'show']);
 Route::post('internal/conversations/requirements', [ConversationController::class, 'saveRequirements']);
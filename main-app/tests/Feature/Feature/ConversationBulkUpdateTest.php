@@ -0,0 +1,44 @@
+<?php
+
+use App\Models\Conversation;
+
+test('message counts can be updated for several conversations at once', function () {
+    $first = Conversation::factory()->create(['title' => 'First idea']);
+    $second = Conversation::factory()->create();
+
+    $this->postJson('/api/internal/conversations/bulk', [
+        'items' => [
+            ['thread_id' => $first->thread_id, 'message_count' => 4],
+            ['thread_id' => $second->thread_id, 'message_count' => 7],
+        ],
+    ])
+        ->assertSuccessful()
+        ->assertJson([
+            'success' => true,
+            'data' => ['updated' => 2],
+        ]);
+
+    expect($first->refresh()->message_count)->toBe(4);
+    expect($first->title)->toBe('First idea');
+    expect($second->refresh()->message_count)->toBe(7);
+});
+
+test('unknown thread ids are skipped in bulk updates', function () {
+    $this->postJson('/api/internal/conversations/bulk', [
+        'items' => [
+            ['thread_id' => 'unknown-thread', 'message_count' => 3],
+        ],
+    ])
+        ->assertSuccessful()
+        ->assertJson([
+            'success' => true,
+            'data' => ['updated' => 0],
+        ]);
+
+    expect(Conversation::where('thread_id', 'unknown-thread')->exists())->toBeFalse();
+});
+
+test('bulk updates require items', function () {
+    $this->postJson('/api/internal/conversations/bulk', [])
+        ->assertUnprocessable();
+});
@@ -0,0 +1,57 @@
+<?php
+
+use App\Models\Conversation;
+use App\Models\User;
+
+test('a conversation is created from its first save', function () {
+    $user = User::factory()->create();
+
+    $this->postJson('/api/internal/conversations', [
+        'user_id' => $user->id,
+        'thread_id' => 'new-thread',
+        'title' => 'First idea',
+        'message_count' => 2,
+    ])
+        ->assertSuccessful()
+        ->assertJson(['success' => true]);
+
+    $conversation = Conversation::where('thread_id', 'new-thread')->first();
+
+    expect($conversation->title)->toBe('First idea');
+    expect($conversation->message_count)->toBe(2);
+});
+
+test('saves without a title keep the stored title', function () {
+    $conversation = Conversation::factory()->create([
+        'title' => 'First idea',
+        'message_count' => 2,
+    ]);
+
+    $this->postJson('/api/internal/conversations', [
+        'user_id' => $conversation->user_id,
+        'thread_id' => $conversation->thread_id,
+        'message_count' => 4,
+    ])->assertSuccessful();
+
+    $conversation->refresh();
+
+    expect($conversation->title)->toBe('First idea');
+    expect($conversation->project_id)->not->toBeNull();
+    expect($conversation->message_count)->toBe(4);
+});
+
+test('a late save does not lower the message count', function () {
+    $conversation = Conversation::factory()->create(['message_count' => 6]);
+
+    $this->postJson('/api/internal/conversations', [
+        'user_id' => $conversation->user_id,
+        'thread_id' => $conversation->thread_id,
+        'title' => 'First idea',
+        'message_count' => 2,
+    ])->assertSuccessful();
+
+    $conversation->refresh();
+
+    expect($conversation->title)->toBe('First idea');
+    expect($conversation->message_count)->toBe(6);
+});
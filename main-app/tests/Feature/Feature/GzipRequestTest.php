@@ -0,0 +1,44 @@
+<?php
+
+use App\Models\Conversation;
+
+test('gzip encoded requirements are decompressed and saved', function () {
+    $conversation = Conversation::factory()->create();
+
+    $body = gzencode(json_encode([
+        'thread_id' => $conversation->thread_id,
+        'requirements' => '# Requirements',
+    ]));
+
+    $this->call('POST', '/api/internal/conversations/requirements', [], [], [], [
+        'CONTENT_TYPE' => 'application/json',
+        'HTTP_ACCEPT' => 'application/json',
+        'HTTP_CONTENT_ENCODING' => 'gzip',
+    ], $body)
+        ->assertSuccessful()
+        ->assertJson(['success' => true]);
+
+    expect($conversation->fresh()->requirements)->toBe('# Requirements');
+});
+
+test('invalid gzip bodies are rejected', function () {
+    $this->call('POST', '/api/internal/conversations/requirements', [], [], [], [
+        'CONTENT_TYPE' => 'application/json',
+        'HTTP_ACCEPT' => 'application/json',
+        'HTTP_CONTENT_ENCODING' => 'gzip',
+    ], 'not gzip')
+        ->assertStatus(400)
+        ->assertJson([
+            'success' => false,
+            'message' => 'Invalid gzip request body.',
+        ]);
+});
+
+test('uncompressed requests are unaffected', function () {
+    $conversation = Conversation::factory()->create();
+
+    $this->postJson('/api/internal/conversations/requirements', [
+        'thread_id' => $conversation->thread_id,
+        'requirements' => '# Requirements',
+    ])->assertSuccessful();
+});
@@ -0,0 +1,59 @@
+<?php
+
+use App\Models\User;
+use Illuminate\Http\Client\Request;
+use Illuminate\Support\Facades\Http;
+
+test('ai settings can be updated', function () {
+    Http::fake();
+
+    $user = User::factory()->create();
+
+    $response = $this
+        ->actingAs($user)
+        ->from(route('ai.edit'))
+        ->patch(route('ai.update'), [
+            'provider' => 'openai',
+            'api_key' => 'sk-test-1234567890',
+        ]);
+
+    $response
+        ->assertSessionHasNoErrors()
+        ->assertRedirect(route('ai.edit'));
+
+    expect($user->aiSetting()->first()->provider)->toBe('openai');
+});
+
+test('updating ai settings invalidates the idea agent cache', function () {
+    Http::fake();
+
+    $user = User::factory()->create();
+
+    $this
+        ->actingAs($user)
+        ->patch(route('ai.update'), [
+            'provider' => 'anthropic',
+            'api_key' => 'sk-ant-test-1234567890',
+        ]);
+
+    Http::assertSent(function (Request $request) use ($user) {
+        return str_ends_with($request->url(), '/internal/ai-settings/invalidate')
+            && $request['user_id'] === $user->id;
+    });
+});
+
+test('ai settings are saved even if the idea agent is unreachable', function () {
+    Http::fake(fn () => throw new \Illuminate\Http\Client\ConnectionException('Connection refused'));
+
+    $user = User::factory()->create();
+
+    $this
+        ->actingAs($user)
+        ->patch(route('ai.update'), [
+            'provider' => 'openai',
+            'api_key' => 'sk-test-1234567890',
+        ])
+        ->assertSessionHasNoErrors();
+
+    expect($user->aiSetting()->exists())->toBeTrue();
+});